@@ -9,6 +9,7 @@ export default function App() {
   const [selectedFighter, setSelectedFighter] = useState(null);
   const [fightHistory, setFightHistory] = useState([]);
   const [historyLoading, setHistoryLoading] = useState(false);
+  const [photoWidths, setPhotoWidths] = useState({});
 
   const fetchData = async (type) => {
     try {
@@ -44,14 +45,23 @@ export default function App() {
     return name.substring(0, 2).toUpperCase();
   };
 
-  const getFighterPhotoUrl = (name) => {
-    const slug = name
-      .toLowerCase()
-      .replace(/[^a-z0-9\s-]/g, '')
-      .replace(/\s+/g, '-')
-      .replace(/-+/g, '-')
-      .trim();
-    return `/fighters/${slug}.jpg`;
+  const getFighterPhotoSlug = (name) => name
+    .toLowerCase()
+    .replace(/[^a-z0-9\s-]/g, '')
+    .replace(/\s+/g, '-')
+    .replace(/-+/g, '-')
+    .trim();
+
+  // variants written by src/optimize_fighter_photos.py, its manifest has the real width of each one
+  const getFighterPhoto = (name) => {
+    const slug = getFighterPhotoSlug(name);
+    const widths = photoWidths[slug];
+    if (!widths || !widths.length) return null;
+    const url = `/fighters/optimized/${slug}`;
+    return {
+      src: `${url}-${widths.find((w) => w >= 96) || widths[widths.length - 1]}.jpg`,
+      srcSet: (ext) => widths.map((w) => `${url}-${w}.${ext} ${w}w`).join(', '),
+    };
   };
 
   const openFighterDetails = async (fighter) => {
@@ -79,6 +89,16 @@ export default function App() {
     fetchData(view);
   }, [view]);
 
+  useEffect(() => {
+    fetch('/fighters/optimized/manifest.json')
+      .then((res) => (res.ok ? res.json() : { images: {} }))
+      .then((manifest) => setPhotoWidths(Object.fromEntries(
+        Object.entries(manifest.images || {}).map(([slug, image]) => [slug, image.widths]))))
+      .catch((err) => console.error(err));
+  }, []);
+
+  const selectedPhoto = selectedFighter && getFighterPhoto(selectedFighter.Fighter);
+
   return (
     <div className="min-h-screen bg-white">
 
@@ -153,6 +173,7 @@ export default function App() {
                 {fighters.map((f, i) => {
                   const eloValue = f.Elo || f["Peak Elo"] || 0;
                   const isTopThree = i < 3;
+                  const photo = getFighterPhoto(f.Fighter);
                   return (
                     <tr
                       key={f.Fighter}
@@ -173,17 +194,25 @@ export default function App() {
                         <div className="flex items-center gap-3">
                           <div className="flex-shrink-0">
                             <div className="w-10 h-10 rounded-full bg-gray-200 flex items-center justify-center overflow-hidden">
-                              <img
-                                src={getFighterPhotoUrl(f.Fighter)}
-                                alt={f.Fighter}
-                                className="w-full h-full object-cover object-top"
-                                loading="lazy"
-                                onError={(e) => {
-                                  e.target.style.display = 'none';
-                                  e.target.nextSibling.style.display = 'flex';
-                                }}
-                              />
-                              <div className="hidden w-full h-full items-center justify-center text-gray-700 font-bold text-sm">
+                              {photo && (
+                                <picture className="block w-full h-full">
+                                  <source type="image/avif" srcSet={photo.srcSet("avif")} sizes="40px" />
+                                  <source type="image/webp" srcSet={photo.srcSet("webp")} sizes="40px" />
+                                  <img
+                                    src={photo.src}
+                                    srcSet={photo.srcSet("jpg")}
+                                    sizes="40px"
+                                    alt={f.Fighter}
+                                    className="w-full h-full object-cover object-top"
+                                    loading="lazy"
+                                    onError={(e) => {
+                                      e.target.parentNode.style.display = 'none';
+                                      e.target.parentNode.nextSibling.style.display = 'flex';
+                                    }}
+                                  />
+                                </picture>
+                              )}
+                              <div className={`${photo ? "hidden" : "flex"} w-full h-full items-center justify-center text-gray-700 font-bold text-sm`}>
                                 {getInitials(f.Fighter)}
                               </div>
                             </div>
@@ -261,17 +290,25 @@ export default function App() {
             <div className="sticky top-0 bg-white border-b border-gray-200 p-6 flex justify-between items-center">
               <div className="flex items-center gap-4">
                 <div className="w-16 h-16 rounded-full bg-gray-200 flex items-center justify-center overflow-hidden">
-                  <img
-                    src={getFighterPhotoUrl(selectedFighter.Fighter)}
-                    alt={selectedFighter.Fighter}
-                    className="w-full h-full object-cover object-top"
-                    loading="lazy"
-                    onError={(e) => {
-                      e.target.style.display = 'none';
-                      e.target.nextSibling.style.display = 'flex';
-                    }}
-                  />
-                  <div className="hidden w-full h-full items-center justify-center text-gray-700 font-bold text-xl">
+                  {selectedPhoto && (
+                    <picture className="block w-full h-full">
+                      <source type="image/avif" srcSet={selectedPhoto.srcSet("avif")} sizes="64px" />
+                      <source type="image/webp" srcSet={selectedPhoto.srcSet("webp")} sizes="64px" />
+                      <img
+                        src={selectedPhoto.src}
+                        srcSet={selectedPhoto.srcSet("jpg")}
+                        sizes="64px"
+                        alt={selectedFighter.Fighter}
+                        className="w-full h-full object-cover object-top"
+                        loading="lazy"
+                        onError={(e) => {
+                          e.target.parentNode.style.display = 'none';
+                          e.target.parentNode.nextSibling.style.display = 'flex';
+                        }}
+                      />
+                    </picture>
+                  )}
+                  <div className={`${selectedPhoto ? "hidden" : "flex"} w-full h-full items-center justify-center text-gray-700 font-bold text-xl`}>
                     {getInitials(selectedFighter.Fighter)}
                   </div>
                 </div>
@@ -0,0 +1,210 @@
+"""
+Benchmarks for the Elo engine and the API on synthetic fight histories.
+
+Covers loading, replay, leaderboards and export of the tracker, then the web layer through
+the Flask test client on what the export produced. Every run is appended to a JSON-lines
+history, and each timing is compared with the median of the last few runs of the same
+benchmark on the same machine and size. Anything more than --threshold slower is flagged.
+
+python bench_suite.py --sizes 10k,100k
+python bench_suite.py --only web. --check    # exit 1 when something regressed
+"""
+import argparse, contextlib, io, json, os, platform, shutil, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "web"))
+
+from elo_engine import EloEngine
+from synthetic_fights import generate_fights, parse_size
+
+BENCH_DIR = os.path.join(ROOT, ".bench")  # generated histories and the results history
+HISTORY_PATH = os.path.join(BENCH_DIR, "history.jsonl")
+REQUESTS = 200  # requests per timing of a web benchmark, the result is per request
+WEB_BENCHMARKS = ["web.bundle_load", "web.current", "web.current_page", "web.peak_search",
+                  "web.search", "web.trends", "web.predict", "web.as_of"]
+
+def synthetic_csv(size, seed):
+    """Path of the generated history, made once per size and seed"""
+    path = os.path.join(BENCH_DIR, f"fights_{size}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        print(f"Generating {size} synthetic fights...")
+        generate_fights(size, seed).to_csv(path, index=False)
+    return path
+
+def timed(fn, repeat):
+    """Seconds of each of `repeat` calls"""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return times
+
+def quiet(fn):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+    return run
+
+def engine_benchmarks(path, out_dir):
+    """(name, fn) pairs in run order, each step leaves the engine ready for the next"""
+    engine = EloEngine()
+    engine._manual_champs = {}
+    quiet(lambda: engine.load_fights(path))()  # caches the Parquet copy, the timed loads read that
+
+    def replay():
+        engine.replay()
+
+    def leaderboards():
+        engine._boards = None
+        engine.leaderboards()
+
+    def export():
+        engine.export(os.path.join(out_dir, "elo_checkpoint.json"), out_dir)
+
+    return engine, [
+        ("elo.load", quiet(lambda: engine.load_fights(path))),
+        ("elo.replay", quiet(replay)),
+        ("elo.leaderboards", leaderboards),
+        ("elo.export", quiet(export)),
+    ]
+
+def web_benchmarks(out_dir, dates):
+    """name -> fn for WEB_BENCHMARKS on the export in out_dir. dates are YYYY-MM-DD strings the as_of requests cycle through"""
+    import app as web_app
+    from store import Bundle, BundleStore
+    from publish import read_manifest
+
+    manifest = read_manifest(out_dir)
+    directory = os.path.join(out_dir, manifest["path"])
+    web_app.bundles = BundleStore(out_dir)
+    client = web_app.app.test_client()
+    bundle = web_app.bundles.get()
+    current = bundle.part("current").records
+    peak = bundle.part("peak").records
+    names = [r["Fighter"] for r in peak[:REQUESTS]]
+    pairs = [[current[i]["Fighter"], current[-1 - i]["Fighter"]] for i in range(min(500, len(current)))]
+
+    def requests(make):
+        def run():
+            for i in range(REQUESTS):
+                res = make(i)
+                assert res.status_code == 200, res.status_code
+        return run
+
+    as_of = iter(range(10 ** 9))
+    return dict([
+        ("web.bundle_load", lambda: Bundle(directory, manifest["version"])),
+        ("web.current", requests(lambda i: client.get("/api/current", headers={"Accept-Encoding": "br"}))),
+        ("web.current_page", requests(lambda i: client.get(f"/api/current?sort=Fighter&limit=50&offset={i % 10 * 50}"))),
+        ("web.peak_search", requests(lambda i: client.get(f"/api/peak?search={names[i % len(names)][:4]}&limit=20"))),
+        ("web.search", requests(lambda i: client.get(f"/api/search?q={names[i % len(names)][:5]}"))),
+        ("web.trends", requests(lambda i: client.get(f"/api/trends/{names[i % len(names)]}"))),
+        ("web.predict", requests(lambda i: client.post("/api/predict", json={"pairs": pairs}))),
+        # a new date every request, so the history boards are built, not cached
+        ("web.as_of", requests(lambda i: client.get(f"/api/current?as_of={dates[next(as_of) % len(dates)]}"))),
+    ])
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+" if dirty else "")
+
+def load_history(path):
+    try:
+        with open(path, "r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def baseline(history, record, window):
+    """Median best time of the last `window` runs of the same benchmark, size and machine"""
+    same = [r["min_s"] for r in history
+            if (r["bench"], r["size"], r["host"], r["python"]) == (record["bench"], record["size"], record["host"], record["python"])]
+    return statistics.median(same[-window:]) if same else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Elo engine and the API on synthetic fight histories")
+    parser.add_argument("--sizes", default="10k", help="comma separated history sizes, like 10k,100k,1M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, the best one counts")
+    parser.add_argument("--only", help="comma separated benchmark name prefixes, like elo.replay,web.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown over the baseline flagged as a regression")
+    parser.add_argument("--window", type=int, default=5, help="earlier runs the baseline is the median of")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON-lines file of past results")
+    parser.add_argument("--no-record", action="store_true", help="compare only, don't append this run to the history")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when something regressed")
+    args = parser.parse_args()
+
+    only = [p for p in (args.only or "").split(",") if p]
+    wanted = lambda name: not only or any(name.startswith(p) for p in only)
+    history = load_history(args.history)
+    run = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+    }
+    results = []
+    for size in (parse_size(s) for s in args.sizes.split(",")):
+        path = synthetic_csv(size, args.seed)
+        out_dir = tempfile.mkdtemp(prefix="elo-bench-")
+        try:
+            engine, steps = engine_benchmarks(path, out_dir)
+            print(f"\n{size} fights, {len(engine.fights)} loaded")
+            # later steps need the earlier ones, unselected ones run once untimed while something after them is selected
+            for i, (name, fn) in enumerate(steps):
+                if not wanted(name):
+                    if not any(wanted(n) for n, _ in steps[i + 1:]) and not any(wanted(n) for n in WEB_BENCHMARKS):
+                        break
+                    fn()
+                    continue
+                results.append({**run, "size": size, "bench": name, "times": timed(fn, args.repeat)})
+                print(f"  {name:20s} {min(results[-1]['times']):10.4f}s")
+            dates = sorted(engine.fights["Date"].dt.strftime("%Y-%m-%d").unique())
+            web = [name for name in WEB_BENCHMARKS if wanted(name)]
+            benchmarks = web_benchmarks(out_dir, dates) if web else {}
+            for name in web:
+                fn = benchmarks[name]
+                fn()  # warm up
+                times = timed(fn, args.repeat)
+                if name != "web.bundle_load":
+                    times = [t / REQUESTS for t in times]
+                results.append({**run, "size": size, "bench": name, "times": times})
+                print(f"  {name:20s} {min(times) * 1000:10.3f}ms" + ("" if name == "web.bundle_load" else " per request"))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    regressions = []
+    print(f"\n{'benchmark':20s} {'size':>8s} {'best':>10s} {'baseline':>10s} {'change':>8s}")
+    for r in results:
+        r["min_s"] = min(r["times"])
+        r["median_s"] = statistics.median(r["times"])
+        base = baseline(history, r, args.window)
+        change = "" if base is None else f"{(r['min_s'] / base - 1) * 100:+.1f}%"
+        flag = base is not None and r["min_s"] > base * (1 + args.threshold)
+        if flag:
+            regressions.append(r)
+        print(f"{r['bench']:20s} {r['size']:8d} {r['min_s']:10.5f} {'' if base is None else f'{base:10.5f}':>10s} {change:>8s}"
+              + ("  REGRESSION" if flag else ""))
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+        print(f"\nResults appended to {args.history}")
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold:.0%}")
+        if args.check:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,555 @@
+"""
+UFC Elo engine: replays fights into Elo ratings and builds the current/peak leaderboards.
+Run src/tracker2.0.py for the command line version.
+"""
+import pandas as pd, numpy as np, os, json, hashlib, itertools, random
+from concurrent.futures import ProcessPoolExecutor
+from storage import read_table, write_table, typed_fights
+from publish import publish_release
+from instrument import span
+from elo_kernel import (DEFAULT_PARAMS, FIGHTER_STATE, retirement_threshold_days, NO_RESULT, WIN1, WIN2, DRAW, OTHER_DRAW,
+                        new_state, expected, current_ratings, fighter_id, replay)
+from rating_snapshots import SNAPSHOT_KEYS
+
+DATA_DIR=os.path.join(os.path.dirname(os.path.dirname(__file__)),"data")
+os.makedirs(DATA_DIR, exist_ok=True)
+
+FIGHTS_PATH=os.path.join(DATA_DIR,"fights_enhanced.csv")
+MANUAL_CHAMPS_PATH=os.path.join(DATA_DIR,"manual_champions.csv")
+ELO_CURRENT_PATH=os.path.join(DATA_DIR,"current_elo_2.0.csv")
+ELO_PEAK_PATH=os.path.join(DATA_DIR,"peak_elo_2.0.csv")
+FIGHTS_ELO_PATH=os.path.join(DATA_DIR,"fights_with_elo_2.0.csv")
+TRENDS_PATH=os.path.join(DATA_DIR,"fight_trends_2.0.json")
+CHECKPOINT_PATH=os.path.join(DATA_DIR,"elo_checkpoint.json")
+SWEEP_PATH=os.path.join(DATA_DIR,"elo_sweep.csv")
+SNAPSHOTS_PATH=os.path.join(DATA_DIR,"elo_snapshots.npz")
+
+ELO_COLS = ["Fighter1_Elo_Start", "Fighter2_Elo_Start", "Fighter1_Elo_End", "Fighter2_Elo_End"]
+# fight columns the replay reads, a change in any of them invalidates the checkpoint
+REPLAY_COLS = ["Date", "Weight Class", "Fighter 1", "Fighter 2", "Winner", "Round", "Fight URL", "method",
+               "Is_Title_Fight", "Is_Main_Event"]
+
+# fights between rating snapshots, an as-of query replays at most about this many
+SNAPSHOT_FIGHTS = 50
+#tuf filter? might have to improve some stuff
+false_positive_fighters = ["Juan Espino", "Justin Frazier", "Macy Chiasson", "Pannie Kianzad",
+                           "Michael Trizano", "Joe Giannetti", "Guangyou Ning", "Jianping Yang",
+                           "Diego Brandao", "Dennis Bermudez", "Rony Jason", "Godofredo Pepey",
+                           "Ramsey Nijem"]
+
+women_divisions = ["Women's Strawweight", "Women's Flyweight", "Women's Bantamweight",
+                   "Women's Featherweight"]
+
+def load_fights(path=FIGHTS_PATH):
+    f = read_table(path, typed_fights)
+    # scraper writes newest card first and main event first, flip it so same-day
+    # fights (early tournaments) replay in bout order and the order is reproducible
+    return f.iloc[::-1].sort_values("Date", kind="stable").reset_index(drop=True)
+
+def load_manual_champs(path=MANUAL_CHAMPS_PATH):
+    manual_champs = pd.read_csv(path)
+    return dict(zip(manual_champs["Fighter"], manual_champs["Status"]))
+
+def save_checkpoint(state, path=CHECKPOINT_PATH):
+    data = {k: v for k, v in state.items() if k != "ids"}
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fp:
+        json.dump(data, fp)
+    os.replace(tmp, path)
+
+def load_checkpoint(path=CHECKPOINT_PATH, params=DEFAULT_PARAMS):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as fp:
+        state = json.load(fp)
+    if state.keys() != new_state().keys():
+        return None  # written by an older layout
+    if state["params"] != params:
+        return None  # replayed with different model constants
+    return state
+
+def resume_point(f, state):
+    """Number of leading fights in f already covered by the checkpoint, or None if it doesn't line up"""
+    n = state["n_fights"]
+    if n == 0:
+        return 0
+    if n > len(f) or f.at[n - 1, "Fight URL"] != state["last_fight_url"]:
+        return None
+    if fights_hash(f.iloc[:n]) != state["fights_hash"]:
+        return None  # an already replayed fight changed (overturned result, corrected data)
+    return n
+
+def fights_hash(f):
+    return hashlib.sha1(pd.util.hash_pandas_object(f[REPLAY_COLS], index=False).to_numpy().tobytes()).hexdigest()
+
+def fight_columns(f, state):
+    """Pull the replay inputs out of the fights frame as plain lists, fighters interned to ids"""
+    fighter1, fighter2, winner = f["Fighter 1"].tolist(), f["Fighter 2"].tolist(), f["Winner"].tolist()
+    f1_ids, f2_ids, results = [], [], []
+    for a, b, w in zip(fighter1, fighter2, winner):
+        f1_ids.append(fighter_id(state, a))
+        f2_ids.append(fighter_id(state, b))
+        if w == a:
+            results.append(WIN1)
+        elif w == b:
+            results.append(WIN2)
+        elif w == "Draw":
+            results.append(DRAW)
+        elif str(w).lower() == "draw":
+            results.append(OTHER_DRAW)
+        else:
+            results.append(NO_RESULT)
+
+    is_tuf_fight = (((f["Fighter 1"] == "Tony Ferguson") & (f["Fighter 2"] == "Ramsey Nijem"))
+                    | ((f["Fighter 1"] == "Ramsey Nijem") & (f["Fighter 2"] == "Tony Ferguson")))
+    is_false_positive = f["Fighter 1"].isin(false_positive_fighters) | f["Fighter 2"].isin(false_positive_fighters) | is_tuf_fight
+
+    return {
+        "f1": f1_ids, "f2": f2_ids, "result": results,
+        "method": f["method"].tolist(),
+        # -1 for a missing round, never an early finish, like the str(round_).isdigit() check
+        "round": pd.to_numeric(f["Round"], errors="coerce").fillna(-1).astype(int).tolist(),
+        "is_title": (f["Is_Title_Fight"].astype(bool) & ~is_false_positive).tolist(),
+        "is_main": f["Is_Main_Event"].astype(bool).tolist(),
+        "weight_class": f["Weight Class"].tolist(),
+        "fight_url": f["Fight URL"].tolist(),
+    }
+
+def score_predictions(results, elo_values):
+    """How well expected() on the pre-fight Elo predicted each decisive fight"""
+    results = np.asarray(results)
+    decisive = (results == WIN1) | (results == WIN2)
+    p = np.clip(expected(elo_values[decisive, 0], elo_values[decisive, 1]), 1e-12, 1 - 1e-12)
+    won = results[decisive] == WIN1
+    called = p != 0.5
+    return {
+        "log_loss": float(-np.mean(np.where(won, np.log(p), np.log(1 - p)))),
+        "brier": float(np.mean((p - won) ** 2)),
+        "accuracy": float(np.mean((p[called] > 0.5) == won[called])) if called.any() else float("nan"),
+        "scored_fights": int(decisive.sum()),
+    }
+
+def rate_current(final, today, is_champion, wins, losses, record, title_defenses, former_champions, params=DEFAULT_PARAMS):
+    """Current Elo as of `today` (decay, title boosts, status) for a Fighter/Elo/Last_Fight/Weight Class frame
+    with aligned per-fighter arrays, returns (final, active_fighters)"""
+    elo, title_defenses, former_champions, status, active = current_ratings(
+        final["Elo"], final["Last_Fight"], today, is_champion, wins, losses, title_defenses, former_champions, params)
+    final["Is_Champion"] = is_champion
+    final["Elo"] = elo
+    final["Title_Defenses"] = title_defenses
+    final["Is_Former_Champion"] = former_champions
+    final["Status"] = status
+    final["Record"] = record
+    return final, final[active].copy()
+
+def build_leaderboards(f, state, manual_champs_dict):
+    """Current and peak leaderboards from the replayed state, returns (final, active_fighters, peak_df)"""
+    params = state["params"]
+
+    # per-fighter arrays, aligned with names (first appearance order)
+    names = state["names"]
+    wins, losses, draws = np.array(state["wins"]), np.array(state["losses"]), np.array(state["draws"])
+    title_defenses = np.array(state["title_defenses"])
+    former_champions = np.array(state["former_champions"], dtype=bool)
+    record = pd.Series(wins).astype(str) + "-" + pd.Series(losses).astype(str) + "-" + pd.Series(draws).astype(str)
+    is_manual_champ = pd.Series(names).map(manual_champs_dict).isin(["Champion", "Transition Champion"]).to_numpy()
+
+    today = f["Date"].max()
+    d1 = f.groupby("Fighter 1")["Date"].max().reset_index().rename(columns={"Fighter 1": "Fighter"})
+    d2 = f.groupby("Fighter 2")["Date"].max().reset_index().rename(columns={"Fighter 2": "Fighter"})
+    rd = pd.concat([d1, d2], ignore_index=True).groupby("Fighter")["Date"].max().reset_index()
+    rd.columns = ["Fighter", "Last_Fight"]
+
+    f1_weight = f[["Fighter 1", "Weight Class", "Date"]].rename(columns={"Fighter 1": "Fighter"})
+    f2_weight = f[["Fighter 2", "Weight Class", "Date"]].rename(columns={"Fighter 2": "Fighter"})
+    weight_data = pd.concat([f1_weight, f2_weight], ignore_index=True).sort_values("Date").groupby("Fighter").last().reset_index()
+    weight_data = weight_data[["Fighter", "Weight Class"]]
+
+    final = pd.DataFrame({"Fighter": names, "Elo": state["elo"]}).merge(rd, on="Fighter", how="left").merge(weight_data, on="Fighter", how="left")
+    final, active_fighters = rate_current(final, today, is_manual_champ, wins, losses, record, title_defenses, former_champions, params)
+
+    title_wins = f[f["Is_Title_Fight"] & ((f["Winner"] == f["Fighter 1"]) | (f["Winner"] == f["Fighter 2"]))]
+    title_classes = title_wins.groupby("Winner")["Weight Class"].nunique()
+    multi_division_champs = pd.Series(names).map(title_classes).fillna(0).to_numpy() >= 2
+    # title fight winners who defended a belt at least once
+    undisputed_champions = pd.Series(names).isin(title_wins["Winner"]).to_numpy() & (title_defenses >= 1)
+
+    peak_df = pd.DataFrame({"Fighter": names, "Peak Elo": state["peak"]}).merge(weight_data, on="Fighter", how="left")
+
+    # special achievement bonus
+    # multi-divison champ
+    peak_df["Peak Elo"] = np.where(multi_division_champs, peak_df["Peak Elo"] * 1.08, peak_df["Peak Elo"])
+
+    # 2. undefeated champ bonus
+    is_undefeated_champ = (losses == 0) & (wins >= 10) & former_champions
+    peak_df["Peak Elo"] = np.where(is_undefeated_champ, peak_df["Peak Elo"] * 1.10, peak_df["Peak Elo"])
+
+    # 3. certain loss penalty, multi-div champ excluded
+    loss_penalty = np.select(
+        [multi_division_champs, losses >= 9, losses >= 7, losses >= 5, losses >= 3],
+        [1.0,
+         0.70,  # 30% penalty for 9+ losses (cough cough Tony)
+         0.86,  # 14% penalty for 7-8 losses
+         0.92,  # 8% penalty for 5-6 losses
+         0.97],  # 3% penalty for 3-4 losses
+        1.0,
+    )
+    peak_df["Peak Elo"] = peak_df["Peak Elo"] * loss_penalty
+
+    peak_df["Peak Elo"] = np.where(peak_df["Weight Class"].isin(women_divisions), peak_df["Peak Elo"] * 0.90, peak_df["Peak Elo"])
+
+    never_won_undisputed_title = ~undisputed_champions & ~is_manual_champ & (losses >= 5)
+    peak_df["Peak Elo"] = np.where(never_won_undisputed_title, peak_df["Peak Elo"] * 0.88, peak_df["Peak Elo"])
+
+    peak_df["Peak Elo"] = peak_df["Peak Elo"] * 1.08
+
+    peak_df["Record"] = record
+    return final, active_fighters, peak_df
+
+def build_trends(f):
+    """Per-fighter fight history keyed by lowercase name, in fight order, as served by /api/trends"""
+    sides = []
+    for me, opp, start, end in [("Fighter 1", "Fighter 2", "Fighter1_Elo_Start", "Fighter1_Elo_End"),
+                                ("Fighter 2", "Fighter 1", "Fighter2_Elo_Start", "Fighter2_Elo_End")]:
+        side = pd.DataFrame({
+            "Key": f[me].str.lower(),
+            "Date": f["Date"].dt.strftime("%Y-%m-%d"),
+            "Opponent": f[opp],
+            "Result": np.where(f["Winner"] == f[me], "Win", np.where(f["Winner"] == "Draw", "Draw", "Loss")),
+            "Method": f["method"],
+            "Event": f["Event"],
+            "EloBefore": f[start],
+            "EloAfter": f[end],
+            "EloChange": f[end] - f[start],
+        })
+        side["Order"] = np.arange(len(f))
+        sides.append(side)
+    rows = pd.concat(sides, ignore_index=True).sort_values("Order", kind="stable")
+
+    trends = {}
+    for key, fights in rows.drop(columns="Order").groupby("Key", sort=False):
+        trends[key] = fights.drop(columns="Key").to_dict("records")
+    return trends
+
+def write_trends(f, path=TRENDS_PATH):
+    # one fighter per line, so a new event only changes the lines of the fighters on the card
+    lines = [f"{json.dumps(name)}: {json.dumps(fights)}" for name, fights in build_trends(f).items()]
+    with open(path, "w") as fp:
+        fp.write("{\n" + ",\n".join(lines) + "\n}\n")
+
+def current_json(active_fighters):
+    """Current leaderboard in the layout of current_elo_2.0.json, Last_Fight in epoch ms"""
+    active_json=active_fighters[["Fighter","Elo","Last_Fight","Weight Class","Status","Record"]].copy()
+    active_json["Last_Fight"]=active_json["Last_Fight"].astype('int64')//10**6
+    return active_json.sort_values("Elo",ascending=False)
+
+def date_days(dates):
+    """Dates as int64 days since the epoch, NaT sorted after everything"""
+    days = pd.Series(dates).to_numpy("datetime64[D]").astype(np.int64)
+    return np.where(pd.isna(dates), np.iinfo(np.int64).max, days)
+
+def new_snapshot_parts():
+    """Snapshot arrays as lists of chunks, holding only keyframe 0 (no fights replayed)"""
+    parts = {key: [] for key in SNAPSHOT_KEYS}
+    parts["kf_fight"].append(np.zeros(1, dtype=np.int64))
+    parts["kf_date"].append(np.array([np.iinfo(np.int64).min]))
+    parts["kf_names"].append(np.zeros(1, dtype=np.int64))
+    return parts
+
+def replay_snapshots(state, cols, days, start, parts):
+    """replay() that also records a keyframe into parts every SNAPSHOT_FIGHTS fights (cut between event dates).
+
+    cols are the fights from index `start` of the history on, days the dates of the whole history, and the last
+    keyframe in parts must be the state after the first `start` fights. Keyframes are delta encoded, each one only
+    has rows for the fighters whose state changed since the previous one.
+    """
+    n = len(cols["f1"])
+    cuts = [start]
+    for i in range(start + 1, start + n):
+        if i - cuts[-1] >= SNAPSHOT_FIGHTS and days[i] != days[i - 1]:
+            cuts.append(i)
+    if n:
+        cuts.append(start + n)
+
+    out = np.empty((n, 4))
+    prev = {key: np.array(state[key], dtype=float) for key in FIGHTER_STATE}
+    k = sum(len(c) for c in parts["kf_fight"]) - 1
+    seen = int(parts["kf_names"][-1][-1])
+    kf_fight, kf_date, kf_names = [], [], []
+    for a, b in zip(cuts, cuts[1:]):
+        k += 1
+        segment = {key: values[a - start:b - start] for key, values in cols.items()}
+        # only the fighters of these fights can change, plus a champion stripped by a title fight between others
+        candidates = np.unique(np.concatenate([segment["f1"], segment["f2"], list(state["current_champions"].values())]).astype(np.int64))
+        out[a - start:b - start] = replay(state, segment)
+        cur = {key: np.array([state[key][i] for i in candidates], dtype=float) for key in FIGHTER_STATE}
+        changed = np.any([cur[key] != prev[key][candidates] for key in FIGHTER_STATE], axis=0)
+        parts["d_kf"].append(np.full(changed.sum(), k))
+        parts["d_id"].append(candidates[changed])
+        for key in FIGHTER_STATE:
+            parts[f"d_{key}"].append(cur[key][changed])
+            prev[key][candidates[changed]] = cur[key][changed]
+        champions = state["current_champions"]
+        parts["c_kf"].append(np.full(len(champions), k))
+        parts["c_weight_class"].append(np.array(list(champions), dtype=str))
+        parts["c_id"].append(np.array(list(champions.values()), dtype=np.int64))
+        seen = max(seen, max(segment["f1"]) + 1, max(segment["f2"]) + 1)
+        # keyframe k is the state after the first kf_fight[k] fights, kf_date is the date of the last of them
+        kf_fight.append(b)
+        kf_date.append(days[b - 1])
+        kf_names.append(seen)
+
+    parts["kf_fight"].append(np.array(kf_fight, dtype=np.int64))
+    parts["kf_date"].append(np.array(kf_date, dtype=np.int64))
+    parts["kf_names"].append(np.array(kf_names, dtype=np.int64))
+    parts["date"].append(days[start:start + n])
+    for key in ("f1", "f2", "result", "round"):
+        parts[key].append(np.array(cols[key], dtype=np.int64))
+    parts["method"].append(np.array(cols["method"], dtype=str))
+    parts["is_title"].append(np.array(cols["is_title"], dtype=bool))
+    parts["is_main"].append(np.array(cols["is_main"], dtype=bool))
+    parts["weight_class"].append(np.array(cols["weight_class"], dtype=str))
+    return out
+
+def snapshot_arrays(state, parts):
+    """Contents of elo_snapshots.npz from the replayed state and the parts replay_snapshots() recorded"""
+    joined = {key: np.concatenate(chunks) if chunks else np.zeros(0) for key, chunks in parts.items()}
+    weight_class_codes, weight_classes = pd.factorize(pd.Series(joined["weight_class"], dtype=object))
+    return {
+        "params": np.array(json.dumps(state["params"])),
+        "fights_hash": np.array(state["fights_hash"] or ""),
+        "names": np.array(state["names"], dtype=str),
+        "weight_classes": np.array(weight_classes, dtype=str),
+        **joined,
+        "weight_class": weight_class_codes,
+    }
+
+def load_snapshot_parts(path, state):
+    """Parts of an existing snapshot file to extend, None unless it was written for exactly the fights in state"""
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            data = {key: z[key] for key in z.files}
+    except (FileNotFoundError, ValueError, OSError):
+        return None
+    if ("fights_hash" not in data or str(data["fights_hash"]) != state["fights_hash"]
+            or json.loads(str(data["params"])) != state["params"] or data["kf_fight"][-1] != state["n_fights"]
+            or data["names"].tolist() != state["names"][:len(data["names"])]):
+        return None
+    parts = {key: [data[key]] for key in SNAPSHOT_KEYS}
+    parts["weight_class"] = [data["weight_classes"][data["weight_class"]]]
+    return parts
+
+def build_snapshots(f, params=DEFAULT_PARAMS):
+    """Snapshot arrays for the fights frame, from a full replay"""
+    state = new_state(params)
+    parts = new_snapshot_parts()
+    replay_snapshots(state, fight_columns(f, state), date_days(f["Date"]), 0, parts)
+    state["fights_hash"] = fights_hash(f)
+    return snapshot_arrays(state, parts)
+
+def write_snapshots(snapshots, path=SNAPSHOTS_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fp:
+        np.savez_compressed(fp, **snapshots)
+    os.replace(tmp, path)
+
+def write_outputs(f, state, final, active_fighters, peak_df, data_dir=DATA_DIR, snapshots=None):
+    fights_elo_path,trends_path,snapshots_path,current_path,peak_path=(
+        os.path.join(data_dir,os.path.basename(p)) for p in (FIGHTS_ELO_PATH,TRENDS_PATH,SNAPSHOTS_PATH,ELO_CURRENT_PATH,ELO_PEAK_PATH))
+    current_json_path=os.path.join(data_dir,"current_elo_2.0.json")
+    peak_json_path=os.path.join(data_dir,"peak_elo_2.0.json")
+
+    with span("elo.write_fights", rows=len(f)):
+        write_table(f, fights_elo_path)
+    with span("elo.write_trends"):
+        write_trends(f, trends_path)
+    with span("elo.write_snapshots"):
+        write_snapshots(snapshots if snapshots is not None else build_snapshots(f, state["params"]), snapshots_path)
+    active_fighters.sort_values("Elo",ascending=False).to_csv(current_path,index=False)
+    peak_df.sort_values("Peak Elo",ascending=False).to_csv(peak_path,index=False)
+
+    retired_count=len(final)-len(active_fighters)
+    print("UFC Elo Tracker 2 complete.")
+    print("Saved files:")
+    print(f" - Fight-by-fight Elo data: {fights_elo_path}")
+    print(f" - Per-fighter trends: {trends_path}")
+    print(f" - Rating snapshots: {snapshots_path}")
+    print(f" - Current Elo leaderboard: {current_path}")
+    print(f" - Peak Elo leaderboard: {peak_path}")
+    print(f"\nFiltered {retired_count} retired fighters (inactive {retirement_threshold_days}+ days) from current Elo")
+
+    current_json(active_fighters).to_json(current_json_path,orient="records",indent=2)
+    peak_df.sort_values("Peak Elo",ascending=False).to_json(peak_json_path,orient="records",indent=2)
+
+    print("\nJSON exports created:")
+    print(f" - {current_json_path} (current elo)")
+    print(f" - {peak_json_path} (peak elo)")
+
+    print(f"\nDetected {sum(active_fighters['Is_Champion'])} current champions")
+    print(f"Detected {sum(state['former_champions'])} former champions")
+    print(f"Identified {f['Is_Title_Fight'].sum()} title fights")
+
+    with span("publish.release"):
+        manifest=publish_release([fights_elo_path,trends_path,snapshots_path,current_path,peak_path,current_json_path,peak_json_path],
+                                 {"fights":len(f),"fights_hash":state["fights_hash"]},data_dir=data_dir)
+    print(f"\nPublished release {manifest['version']} ({manifest['path']})")
+
+class EloEngine:
+    """Fight replay plus leaderboards, kept in memory between calls.
+
+    engine = EloEngine()
+    engine.load_fights()
+    engine.replay(incremental=True)
+    engine.leaderboard("current")
+    """
+
+    def __init__(self, params=DEFAULT_PARAMS):
+        self.params = params
+        self.fights = None  # sorted fights frame with the Elo columns filled in by replay()
+        self.state = new_state(params)
+        self._manual_champs = None
+        self._boards = None
+        self._snapshot_parts = None  # keyframes recorded by replay(), None once they no longer match the state
+
+    def load_fights(self, path=FIGHTS_PATH):
+        with span("elo.load") as s:
+            self.fights = load_fights(path)
+            s.set(rows=len(self.fights))
+        for col in ELO_COLS:
+            self.fights[col] = 0.0
+        self.state = new_state(self.params)
+        self._boards = None
+        self._snapshot_parts = None
+        return self.fights
+
+    def replay(self, incremental=False, checkpoint_path=CHECKPOINT_PATH, data_dir=DATA_DIR):
+        """Replay the loaded fights, resuming from the saved checkpoint and the outputs export() wrote to data_dir when incremental"""
+        if self.fights is None:
+            raise RuntimeError("call load_fights() first")
+        f = self.fights
+        elo_values = np.zeros((len(f), 4))
+        state, start, parts = None, 0, None
+        if incremental:
+            state = load_checkpoint(checkpoint_path, self.params)
+            start = resume_point(f, state) if state is not None else None
+            prior = None
+            fights_elo_path = os.path.join(data_dir, os.path.basename(FIGHTS_ELO_PATH))
+            if start and os.path.exists(fights_elo_path):
+                # fights already replayed keep the Elo columns from the last run
+                prior = read_table(fights_elo_path, columns=["Fight URL"] + ELO_COLS)
+                if len(prior) < start or prior.at[start - 1, "Fight URL"] != state["last_fight_url"]:
+                    prior = None
+                # the rating snapshots are extended from the ones written with the checkpoint
+                parts = load_snapshot_parts(os.path.join(data_dir, os.path.basename(SNAPSHOTS_PATH)), state)
+            if start is None or (start and (prior is None or parts is None)):
+                print("Checkpoint doesn't match the fight data, running a full rebuild")
+                state, start = None, 0
+            elif start:
+                elo_values[:start] = prior[ELO_COLS].to_numpy()[:start]
+        if state is None:
+            state = new_state(self.params)
+        if not start:
+            parts = new_snapshot_parts()
+
+        print(f"Replaying {len(f) - start} fights ({start} restored from checkpoint)")
+        with span("elo.replay", restored=start) as s:
+            elo_values[start:] = replay_snapshots(state, fight_columns(f.iloc[start:], state), date_days(f["Date"]), start, parts)
+            f[ELO_COLS] = elo_values
+            state["fights_hash"] = fights_hash(f)
+            s.set(rows=len(f) - start)
+        self.state = state
+        self._boards = None
+        self._snapshot_parts = parts
+        return self
+
+    def apply_fight(self, fighter1, fighter2, winner, method="DEC", round_=3, weight_class="",
+                    is_title=False, is_main=False, date=None, event="", fight_url=""):
+        """Replay one extra fight on top of the current state (new results or what-ifs), returns (start1, start2, end1, end2)"""
+        if self.fights is None:
+            raise RuntimeError("call load_fights() first")
+        row = pd.DataFrame([{
+            "Event": event, "Date": pd.Timestamp(date) if date is not None else self.fights["Date"].max(),
+            "Weight Class": weight_class, "Fighter 1": fighter1, "Fighter 2": fighter2,
+            "Winner": winner, "Method": method, "Round": round_, "Time": "", "Event URL": "",
+            "Fight URL": fight_url, "method": method, "Is_Title_Fight": is_title, "Is_Main_Event": is_main,
+        }])
+        row[ELO_COLS] = replay(self.state, fight_columns(row, self.state))
+        self.fights = pd.concat([self.fights, row], ignore_index=True)
+        self.state["fights_hash"] = fights_hash(self.fights)
+        self._boards = None
+        self._snapshot_parts = None
+        return tuple(row[ELO_COLS].iloc[0])
+
+    @property
+    def manual_champs(self):
+        if self._manual_champs is None:
+            self._manual_champs = load_manual_champs()
+        return self._manual_champs
+
+    def leaderboards(self):
+        """(final, active_fighters, peak_df), rebuilt only after the state changes"""
+        if self._boards is None:
+            with span("elo.leaderboards") as s:
+                self._boards = build_leaderboards(self.fights, self.state, self.manual_champs)
+                s.set(rows=len(self._boards[0]))
+        return self._boards
+
+    def leaderboard(self, kind="current"):
+        final, active_fighters, peak_df = self.leaderboards()
+        if kind == "current":
+            return active_fighters.sort_values("Elo", ascending=False).reset_index(drop=True)
+        if kind == "peak":
+            return peak_df.sort_values("Peak Elo", ascending=False).reset_index(drop=True)
+        raise ValueError(f"Unknown leaderboard: {kind}")
+
+    def export(self, checkpoint_path=CHECKPOINT_PATH, data_dir=DATA_DIR):
+        """Write the fight-by-fight, current and peak outputs to data_dir plus the checkpoint they resume from"""
+        final, active_fighters, peak_df = self.leaderboards()
+        with span("elo.export", rows=len(self.fights)):
+            save_checkpoint(self.state, checkpoint_path)
+            snapshots = snapshot_arrays(self.state, self._snapshot_parts) if self._snapshot_parts is not None else None
+            write_outputs(self.fights, self.state, final, active_fighters, peak_df, data_dir, snapshots)
+
+# sweep workers get the parsed fights once through the pool initializer
+_sweep_data = None
+
+def _init_sweep_worker(f, cols, names, manual_champs_dict):
+    global _sweep_data
+    _sweep_data = (f, cols, names, manual_champs_dict)
+
+def _sweep_one(overrides):
+    f, cols, names, manual_champs_dict = _sweep_data
+    state = new_state({**DEFAULT_PARAMS, **overrides})
+    for name in names:
+        fighter_id(state, name)
+    elo_values = replay(state, cols)
+
+    _, active_fighters, _ = build_leaderboards(f, state, manual_champs_dict)
+    top = active_fighters.sort_values("Elo", ascending=False)["Fighter"].head(5)
+    return {**overrides, **score_predictions(cols["result"], elo_values), "top_current": " / ".join(top)}
+
+def sweep_configs(grid, samples=None, seed=0):
+    """Full grid of parameter overrides, or `samples` random picks from it"""
+    keys = list(grid)
+    if samples:
+        rng = random.Random(seed)
+        return [{k: rng.choice(grid[k]) for k in keys} for _ in range(samples)]
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def run_sweep(grid, samples=None, workers=None, seed=0):
+    f = load_fights()
+    manual_champs_dict = load_manual_champs()
+    template = new_state()
+    cols = fight_columns(f, template)
+    configs = sweep_configs(grid, samples, seed)
+
+    print(f"Sweeping {len(configs)} configs over {len(f)} fights")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                             initargs=(f, cols, template["names"], manual_champs_dict)) as pool:
+        rows = list(pool.map(_sweep_one, configs, chunksize=max(1, len(configs) // (4 * (workers or os.cpu_count() or 1)))))
+
+    results = pd.DataFrame(rows).sort_values("log_loss").reset_index(drop=True)
+    results.to_csv(SWEEP_PATH, index=False)
+    print(results.head(10).to_string())
+    print(f"\nSaved sweep results: {SWEEP_PATH}")
+    return results
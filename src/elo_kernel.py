@@ -0,0 +1,240 @@
+"""
+The rating rules and the fight replay kernel, on plain lists and numpy arrays.
+Kept apart from elo_engine so the web app can replay and rate fighters without pandas.
+"""
+import numpy as np
+
+# model constants, the sweep mode overrides any of these
+DEFAULT_PARAMS = {
+    "initial_elo": 1000,
+    "base_k": 40,
+    "draw_mult": 0.99,
+    # get_enhanced_k_factor
+    "finish_mult": 1.10,
+    "early_finish_mult": 1.03,  # KO/SUB in round 1
+    "activity_rate": 0.03,
+    "activity_fights": 25,  # fights before the k factor starts shrinking
+    "strength_rate": 0.0005,
+    "strength_min": 0.85,
+    "strength_max": 1.08,
+    "title_mult": 1.65,
+    "main_event_mult": 1.10,
+    "defense_rate": 0.35,
+    "defense_exp": 1.3,
+    "defense_exp_rate": 0.04,
+    "defense_cap": 2.50,
+    "quality_scale": 3000,
+    "quality_min": 0.8,
+    "quality_max": 1.2,
+    # apply_decay
+    "champ_grace_days": 365,
+    "champ_decay_rate": 0.00005,
+    "grace_days": 120,
+    "decay_rate": 0.0010,
+    "decay_tiers": [[1825, 0.40],  # 5+ years (retired), 60% penalty
+                    [1095, 0.55],  # 3-5 years (likely retired), 45% penalty
+                    [730, 0.70],  # 2-3 years (very inactive), 30% penalty
+                    [550, 0.82]],  # 1.5-2 years (inactive), 18% penalty
+    # get_championship_boost
+    "champ_boost": 1.18,
+    "champ_defense_boost": 0.03,
+    "champ_defense_boost_cap": 0.18,
+    "former_champ_boost": 1.07,
+}
+
+retirement_threshold_days=730
+
+
+# per-fighter state lists, in the order the snapshots store them
+FIGHTER_STATE = ["elo", "peak", "elo_sum", "fcount", "wins", "losses", "draws", "title_defenses", "former_champions"]
+
+
+# fight result codes used by the replay kernel
+NO_RESULT, WIN1, WIN2, DRAW, OTHER_DRAW = 0, 1, 2, 3, 4
+
+def new_state(params=DEFAULT_PARAMS):
+    # fighters are interned to integer ids, per-fighter state lives in flat lists indexed by id
+    return {
+        "params": params,
+        "names": [],
+        "elo": [], "peak": [], "fcount": [],
+        "elo_sum": [],  # running sum of pre-fight elo, averaged over fcount
+        "wins": [], "losses": [], "draws": [],
+        "title_defenses": [],  # number of defenses
+        "former_champions": [],  # 1 if the fighter lost a belt
+        "current_champions": {},  # weight_class -> current champion id
+        "n_fights": 0,  # fights replayed so far
+        "last_fight_url": None,  # key of the last replayed fight
+        "fights_hash": None,  # fights_hash() of the replayed fights
+    }
+
+def expected(a,b):
+    return 1/(1+10**((b-a)/400))
+
+def update(a,b,score_a,k):
+    ea=expected(a,b)
+    na=a+k*(score_a-ea)
+    nb=b+k*((1-score_a)-(1-ea))
+    return na,nb
+
+
+
+def get_enhanced_k_factor(method, fights_done, elo_diff, round_, is_title, is_main, opponent_avg_elo, title_defense_streak=0, params=DEFAULT_PARAMS):
+    p = params
+    m_mult = p["finish_mult"] if method in ["KO","SUB"] else 1.0
+    if method in ["KO","SUB"] and str(round_).isdigit() and int(round_) < 2:
+        m_mult = p["early_finish_mult"]
+
+    act_mult = 1 / (1 + p["activity_rate"] * max(0, fights_done - p["activity_fights"]))
+    strength_mult = max(p["strength_min"], min(p["strength_max"], 1 + p["strength_rate"] * elo_diff))
+
+    title_mult = p["title_mult"] if is_title else 1.0
+    main_mult = p["main_event_mult"] if is_main and not is_title else 1.0
+
+    if is_title:
+        quality_mult = 1.00
+        defense_bonus = min(p["defense_cap"], title_defense_streak * p["defense_rate"] + (title_defense_streak ** p["defense_exp"]) * p["defense_exp_rate"])
+        quality_mult += defense_bonus
+    else:
+        quality_mult = 1.0 + (opponent_avg_elo - 1000) / p["quality_scale"]
+        quality_mult = max(p["quality_min"], min(p["quality_max"], quality_mult))
+
+    return p["base_k"] * m_mult * act_mult * strength_mult * title_mult * main_mult * quality_mult
+
+def days_since(last, ref):
+    """Whole days from each date in `last` to the date `ref`, NaN where there's no date"""
+    last = np.asarray(last, dtype="datetime64[D]")
+    return np.where(np.isnat(last), np.nan, (np.datetime64(ref, "D") - last).astype(float))
+
+def apply_decay(e, last, ref, is_champion, params=DEFAULT_PARAMS):
+    """Inactivity decay for aligned arrays of elo, last fight date and champion flag"""
+    e = np.asarray(e, dtype=float)
+    d = days_since(last, ref)
+
+    # champions keep their elo for a year, then decay slowly
+    champ = np.where(d <= params["champ_grace_days"], e,
+                     e * np.exp(-params["champ_decay_rate"] * (d - params["champ_grace_days"])))
+    # progressive decay for retired/inactive fighters
+    tiers = sorted(params["decay_tiers"], reverse=True)
+    other = np.select(
+        [d <= params["grace_days"]] + [d > days for days, _ in tiers],
+        [e] + [e * mult for _, mult in tiers],
+        e * np.exp(-params["decay_rate"] * (d - params["grace_days"])),
+    )
+    return np.where(np.isnan(d), e, np.where(is_champion, champ, other))
+
+def get_championship_boost(is_champion, title_defenses, is_former_champion, params=DEFAULT_PARAMS):
+    """Elo multiplier for aligned arrays of champion flag, defenses and former champion flag"""
+    defense_bonus = np.minimum(params["champ_defense_boost_cap"], np.asarray(title_defenses) * params["champ_defense_boost"])
+    return np.where(is_champion, params["champ_boost"] + defense_bonus,
+                    np.where(is_former_champion, params["former_champ_boost"], 1.0))
+
+def current_ratings(elo, last, ref, is_champion, wins, losses, title_defenses, former_champions, params=DEFAULT_PARAMS):
+    """Current Elo as of the date `ref` (decay, title boosts, status) for aligned per-fighter arrays,
+    returns (elo, title defenses, former champion flags, statuses, active flags)"""
+    is_champion = np.asarray(is_champion, dtype=bool)
+    elo = apply_decay(elo, last, ref, is_champion, params)
+    title_defenses = np.where(is_champion, title_defenses, 0)
+    former_champions = np.asarray(former_champions, dtype=bool) & ~is_champion
+
+    elo = elo * get_championship_boost(is_champion, title_defenses, former_champions, params)
+
+    # undefeated champion bonus to current Elo as well
+    is_current_undefeated_champ = (np.asarray(losses) == 0) & (np.asarray(wins) >= 8) & is_champion
+    elo = np.where(is_current_undefeated_champ, elo * 1.08, elo)
+
+    status = [f"Champion ({d} defenses)" if champ else "Former Champion" if former else None
+              for champ, d, former in zip(is_champion, title_defenses, former_champions)]
+    active = days_since(last, ref) < retirement_threshold_days
+    return elo, title_defenses, former_champions, status, active
+
+def fighter_id(state, name):
+    ids = state.get("ids")
+    if ids is None:
+        ids = state["ids"] = {n: i for i, n in enumerate(state["names"])}
+    i = ids.get(name)
+    if i is None:
+        i = ids[name] = len(state["names"])
+        state["names"].append(name)
+        state["elo"].append(state["params"]["initial_elo"])
+        state["peak"].append(float("-inf"))
+        for key in ("elo_sum", "fcount", "wins", "losses", "draws", "title_defenses", "former_champions"):
+            state[key].append(0)
+    return i
+
+def replay(state, cols):
+    """Replay pre-extracted fight columns into the state, returns an (n, 4) array of start/end Elo"""
+    params = state["params"]
+    draw_mult = params["draw_mult"]
+    elo, peak, fcount = state["elo"], state["peak"], state["fcount"]
+    elo_sum = state["elo_sum"]
+    wins, losses, draws = state["wins"], state["losses"], state["draws"]
+    current_champions, title_defenses = state["current_champions"], state["title_defenses"]
+    former_champions = state["former_champions"]
+
+    n = len(cols["f1"])
+    out = np.empty((n, 4))
+    if n == 0:
+        return out
+    s1, s2, o1, o2 = [], [], [], []
+    for f1, f2, res, method, round_, is_title, is_main, weight_class in zip(
+            cols["f1"], cols["f2"], cols["result"], cols["method"], cols["round"],
+            cols["is_title"], cols["is_main"], cols["weight_class"]):
+        e1, e2 = elo[f1], elo[f2]
+
+        elo_sum[f1] += e1
+        elo_sum[f2] += e2
+
+        if res == WIN1:
+            wins[f1] += 1
+            losses[f2] += 1
+        elif res == WIN2:
+            wins[f2] += 1
+            losses[f1] += 1
+        elif res != NO_RESULT:
+            draws[f1] += 1
+            draws[f2] += 1
+
+        fcount[f1] += 1
+        fcount[f2] += 1
+        avg_opp_elo_f2 = elo_sum[f2] / fcount[f2]
+
+        current_defense_streak = 0
+        if is_title and current_champions.get(weight_class) == f1:
+            current_defense_streak = title_defenses[f1]
+
+        k = get_enhanced_k_factor(method, fcount[f1], e2 - e1, round_, is_title, is_main, avg_opp_elo_f2, current_defense_streak, params)
+
+        if res == WIN1 or res == WIN2:
+            w = f1 if res == WIN1 else f2
+            if res == WIN1:
+                n1, n2 = update(e1, e2, 1, k)
+            else:
+                n2, n1 = update(e2, e1, 1, k)
+
+            if is_title:
+                old_champ = current_champions.get(weight_class)
+                if old_champ is not None and old_champ != w:
+                    former_champions[old_champ] = 1
+                    title_defenses[w] = 0
+                elif old_champ == w:
+                    title_defenses[w] += 1
+                else:
+                    title_defenses[w] = 0
+                current_champions[weight_class] = w
+        elif res == DRAW:
+            n1, n2 = e1 * draw_mult, e2 * draw_mult
+        else:
+            n1, n2 = e1, e2
+
+        elo[f1], elo[f2] = n1, n2
+        if n1 > peak[f1]:
+            peak[f1] = n1
+        if n2 > peak[f2]:
+            peak[f2] = n2
+        s1.append(e1); s2.append(e2); o1.append(n1); o2.append(n2)
+
+    state["n_fights"] += n
+    state["last_fight_url"] = cols["fight_url"][-1]
+    out[:, 0], out[:, 1], out[:, 2], out[:, 3] = s1, s2, o1, o2
+    return out
@@ -0,0 +1,206 @@
+"""
+Shared HTTP layer for the scrapers: pooled keep-alive session, per-host rate limit, retries
+and an on-disk response cache with ETag/Last-Modified revalidation.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+import os, time, sqlite3, hashlib, threading
+from urllib.parse import urlparse
+from instrument import span
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".http_cache")
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+# ttl values, in seconds
+REVALIDATE = 0  # conditional GET every time
+IMMUTABLE = float("inf")  # never refetched once cached
+DAY = 24 * 3600
+
+class RateLimiter:
+    """Spaces requests to the same host at least 1/per_second apart, shared by all worker threads"""
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second else 0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def make_session(pool_size=8, retries=3, backoff=0.5):
+    """Keep-alive session with a connection pool per host and retries with exponential backoff"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class CacheMiss(Exception):
+    """Offline mode asked for a URL that was never cached"""
+
+class CachedResponse:
+    def __init__(self, url, content, encoding, headers, from_cache):
+        self.url = url
+        self.status_code = 200
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        # same decoding requests.Response.text would have used
+        return str(self.content, self.encoding or "utf-8", errors="replace")
+
+class HttpCache:
+    """Response bodies stored by content hash, with a sqlite index keyed by URL and LRU eviction"""
+
+    def __init__(self, path=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY, sha TEXT, size INTEGER, encoding TEXT, content_type TEXT,
+            etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL)""")
+        self._db.commit()
+
+    def _object_path(self, sha):
+        return os.path.join(self.path, "objects", sha[:2], sha)
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT sha, encoding, content_type, etag, last_modified, fetched_at FROM entries WHERE url = ?",
+                                   (url,)).fetchone()
+        if row is None:
+            return None
+        keys = ("sha", "encoding", "content_type", "etag", "last_modified", "fetched_at")
+        return dict(zip(keys, row))
+
+    def read(self, url, entry, refreshed=False):
+        """Cached body for an entry from lookup(), marking it recently used"""
+        try:
+            with open(self._object_path(entry["sha"]), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        with self._lock:
+            if refreshed:
+                self._db.execute("UPDATE entries SET accessed_at = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (now, url))
+            self._db.commit()
+        return CachedResponse(url, content, entry["encoding"], {"Content-Type": entry["content_type"]}, True)
+
+    def store(self, url, res):
+        sha = hashlib.sha256(res.content).hexdigest()
+        path = self._object_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(res.content)
+            os.replace(tmp, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (url, sha, len(res.content), res.encoding or res.apparent_encoding,
+                              res.headers.get("Content-Type"), res.headers.get("ETag"),
+                              res.headers.get("Last-Modified"), now, now))
+            self._db.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha, size FROM entries)").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for url, sha, size in self._db.execute("SELECT url, sha, size FROM entries ORDER BY accessed_at").fetchall():
+                self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                if self._db.execute("SELECT 1 FROM entries WHERE sha = ?", (sha,)).fetchone() is None:
+                    try:
+                        os.remove(self._object_path(sha))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                if total <= self.max_bytes:
+                    break
+            self._db.commit()
+
+class Fetcher:
+    """GETs through one pooled session, rate limited per host, answered from the cache when possible.
+
+    ttl is per call: REVALIDATE does a conditional GET, IMMUTABLE never refetches a cached URL.
+    In offline mode nothing touches the network and uncached URLs raise CacheMiss.
+    """
+
+    def __init__(self, workers=8, rate=5.0, cache=True, offline=False, cache_dir=CACHE_DIR):
+        self.session = make_session(pool_size=workers)
+        self.limiter = RateLimiter(rate)
+        self.cache = HttpCache(cache_dir) if cache or offline else None
+        self.offline = offline
+
+    def get(self, url, ttl=REVALIDATE):
+        with span("http.get", host=urlparse(url).netloc) as s:
+            res = self._get(url, ttl)
+            s.set(cached=res.from_cache, bytes=len(res.content))
+            return res
+
+    def _get(self, url, ttl):
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry is not None and (self.offline or time.time() - entry["fetched_at"] < ttl):
+            cached = self.cache.read(url, entry)
+            if cached is not None:
+                return cached
+            entry = None  # body went missing from disk
+        if self.offline:
+            raise CacheMiss(url)
+
+        headers = dict(HEADERS)
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.limiter.wait(url)
+        res = self.session.get(url, headers=headers, timeout=10)
+        if res.status_code == 304 and entry is not None:
+            cached = self.cache.read(url, entry, refreshed=True)
+            if cached is not None:
+                return cached
+            res = self.session.get(url, headers=HEADERS, timeout=10)
+        res.raise_for_status()
+        if self.cache:
+            self.cache.store(url, res)
+        return CachedResponse(url, res.content, res.encoding or res.apparent_encoding, res.headers, False)
+
+    def soup(self, url, ttl=REVALIDATE):
+        text = self.get(url, ttl).text
+        with span("html.parse", bytes=len(text)):
+            return BeautifulSoup(text, "html.parser")
+
+_default_fetcher = None
+
+def default_fetcher():
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = Fetcher()
+    return _default_fetcher
+
+def get_soup(url, fetcher=None, ttl=REVALIDATE):
+    with span("fetch.get_soup"):
+        return (fetcher or default_fetcher()).soup(url, ttl)
@@ -0,0 +1,193 @@
+"""
+Lightweight timing spans for the pipeline and the API.
+
+    with span("elo.replay") as s:
+        ...
+        s.set(rows=len(fights))
+
+Each span records wall time, CPU time of its thread and the process' peak RSS. It is
+folded into in-process aggregates (metrics(), served at /api/_metrics) and appended as
+one JSON line to the trace file when there is one. Settings come from the environment
+or configure():
+
+    ELO_TRACE=path        JSON-lines trace file
+    ELO_TRACE_MEMORY=1    tracemalloc peak per span (slows Python down noticeably)
+    ELO_PROFILE=patterns  cProfile spans matching these comma separated names or globs
+                          ("elo.replay", "scrape.*"), .prof files go to ELO_PROFILE_DIR
+"""
+import os, sys, json, time, fnmatch, functools, itertools, threading, tracemalloc, cProfile
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECENT = 512  # wall times kept per span name for the percentiles
+
+_config = {"trace": None, "memory": False, "profile": [], "profile_dir": os.path.join(ROOT, "profiles")}
+_trace_file = None
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+_started = time.time()
+_profile_ids = itertools.count(1)
+
+def configure(trace=None, memory=None, profile=None, profile_dir=None):
+    """Change settings, None leaves one as it is. profile is a list of span names or globs"""
+    global _trace_file
+    with _lock:
+        if trace is not None and trace != _config["trace"]:
+            if _trace_file is not None:
+                _trace_file.close()
+            _config["trace"] = trace
+            _trace_file = open(trace, "a", buffering=1) if trace else None
+        if memory is not None:
+            _config["memory"] = memory
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if profile is not None:
+            _config["profile"] = [p for p in profile if p]
+        if profile_dir is not None:
+            _config["profile_dir"] = profile_dir
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+class Span:
+    """A timed region, use as a context manager or call start() and finish() (e.g. from request hooks)"""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.record = None  # what was recorded, once finished
+        self.parent = None
+        self._profile = None
+        self._mem_peak = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def start(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        if _config["memory"]:
+            self._mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if any(fnmatch.fnmatchcase(self.name, p) for p in _config["profile"]) and not any(s._profile for s in stack[:-1]):
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:  # another thread is already profiling
+                self._profile = None
+        self._ts = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def finish(self, error=None):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        if self._profile is not None:
+            self._profile.disable()
+            os.makedirs(_config["profile_dir"], exist_ok=True)
+            path = os.path.join(_config["profile_dir"], f"{self.name}.{os.getpid()}.{next(_profile_ids)}.prof")
+            self._profile.dump_stats(path)
+            print(f"Profile of {self.name} written to {path}", file=sys.stderr)
+        stack = _local.stack
+        if self in stack:
+            stack.remove(self)
+
+        record = {
+            "name": self.name,
+            "ts": round(self._ts, 3),
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            "rss_peak_mb": peak_rss_mb(),
+            "thread": threading.current_thread().name,
+            "parent": self.parent.name if self.parent else None,
+            **self.attrs,
+        }
+        if error is not None:
+            record["error"] = type(error).__name__
+        if _config["memory"] and tracemalloc.is_tracing():
+            # the global peak is reset by every span, so inner spans hand theirs up
+            peak = max(tracemalloc.get_traced_memory()[1], self._mem_peak)
+            record["mem_peak_mb"] = round((peak - self._mem_start) / (1 << 20), 3)
+            if self.parent is not None:
+                self.parent._mem_peak = max(self.parent._mem_peak, peak)
+        self.record = record
+        _record(record)
+        return record
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(exc)
+        return False
+
+span = Span
+
+def traced(name):
+    """Decorator, runs every call in a span"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with Span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def _record(record):
+    with _lock:
+        stats = _stats.get(record["name"])
+        if stats is None:
+            stats = _stats[record["name"]] = {"count": 0, "errors": 0, "wall_ms": 0.0, "cpu_ms": 0.0,
+                                              "max_wall_ms": 0.0, "rows": 0, "recent": deque(maxlen=RECENT)}
+        stats["count"] += 1
+        stats["errors"] += "error" in record
+        stats["wall_ms"] += record["wall_ms"]
+        stats["cpu_ms"] += record["cpu_ms"]
+        stats["max_wall_ms"] = max(stats["max_wall_ms"], record["wall_ms"])
+        stats["rows"] += record.get("rows") or 0
+        stats["recent"].append(record["wall_ms"])
+        if _trace_file is not None:
+            _trace_file.write(json.dumps(record, default=str) + "\n")
+
+def metrics():
+    """Aggregates per span name since the process started (p50/p95 over the last RECENT spans)"""
+    with _lock:
+        spans = {}
+        for name, s in sorted(_stats.items()):
+            recent = sorted(s["recent"])
+            spans[name] = {
+                "count": s["count"],
+                "errors": s["errors"],
+                "wall_ms_total": round(s["wall_ms"], 3),
+                "wall_ms_mean": round(s["wall_ms"] / s["count"], 3),
+                "wall_ms_p50": recent[len(recent) // 2],
+                "wall_ms_p95": recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                "wall_ms_max": s["max_wall_ms"],
+                "cpu_ms_total": round(s["cpu_ms"], 3),
+                "rows": s["rows"],
+            }
+    return {"pid": os.getpid(), "uptime_s": round(time.time() - _started, 1), "rss_peak_mb": peak_rss_mb(), "spans": spans}
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+configure(
+    trace=os.environ.get("ELO_TRACE") or None,
+    memory=os.environ.get("ELO_TRACE_MEMORY") == "1",
+    profile=os.environ.get("ELO_PROFILE", "").split(","),
+    profile_dir=os.environ.get("ELO_PROFILE_DIR") or None,
+)
@@ -1,71 +1,166 @@
 #!/usr/bin/env python3
 """
-Optimize fighter photos by resizing and compressing them.
-Reduces file size for faster web loading.
+Optimize fighter photos into small web variants.
+Every photo is decoded once and saved at each of WIDTHS it is wide enough for, plus its own
+width if it is narrower than the largest, in each of FORMATS under fighters/optimized/.
+Variants are named by their real width, which the manifest lists per photo for the frontend's
+srcset. The source photos are never modified. Photos whose source hash is in the manifest are skipped.
 """
 import os
-from PIL import Image
+import json
 import glob
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
 
 FIGHTERS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend", "public", "fighters")
-
-MAX_SIZE = 200
-QUALITY = 85  
+OUT_DIR = os.path.join(FIGHTERS_DIR, "optimized")
+MANIFEST_PATH = os.path.join(OUT_DIR, "manifest.json")
+
+# the photos show in 40px and 64px circles, these cover both up to 3x screens
+WIDTHS = (48, 96, 192)
+# preferred first, jpg is the fallback every browser loads
+FORMATS = {
+    "avif": ("AVIF", {"quality": 50}),
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+# a change here redoes every photo
+SETTINGS = {"widths": list(WIDTHS), "formats": {ext: opts for ext, (_, opts) in FORMATS.items()}, "named_by": "output width"}
+
+def variant_widths(width):
+    """Widths of the variants of a photo `width` pixels wide, never upscaled"""
+    return sorted({min(w, width) for w in WIDTHS})
+
+def variant_paths(stem, widths=WIDTHS):
+    return [os.path.join(OUT_DIR, f"{stem}-{w}.{ext}") for w in widths for ext in FORMATS]
+
+def source_sha256(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
 def optimize_image(filepath):
-    """Resize and compress a single image"""
-    try:
-        img = Image.open(filepath)
-        original_size = os.path.getsize(filepath)
-
+    """Write every variant of one photo, returns (source bytes, variant bytes, variant widths)"""
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    with Image.open(filepath) as img:
+        img.load()
         if img.mode in ('RGBA', 'LA', 'P'):
             background = Image.new('RGB', img.size, (255, 255, 255))
             if img.mode == 'P':
                 img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
             img = background
-
-        if img.width > MAX_SIZE or img.height > MAX_SIZE:
-            img.thumbnail((MAX_SIZE, MAX_SIZE), Image.Resampling.LANCZOS)
-
-        img.save(filepath, 'JPEG', quality=QUALITY, optimize=True)
-
-        new_size = os.path.getsize(filepath)
-        reduction = ((original_size - new_size) / original_size) * 100
-
-        print(f"✓ {os.path.basename(filepath)}: {original_size//1024}KB → {new_size//1024}KB (-{reduction:.1f}%)")
-        return original_size, new_size
-
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        total = 0
+        widths = variant_widths(img.width)
+        for width in widths:
+            scaled = img
+            if img.width > width:
+                scaled = img.resize((width, round(img.height * width / img.width)), Image.Resampling.LANCZOS)
+            for ext, (fmt, opts) in FORMATS.items():
+                path = os.path.join(OUT_DIR, f"{stem}-{width}.{ext}")
+                tmp = f"{path}.tmp"
+                scaled.save(tmp, fmt, **opts)
+                os.replace(tmp, path)
+                total += os.path.getsize(path)
+    return os.path.getsize(filepath), total, widths
+
+def _optimize(job):
+    filepath, sha = job
+    try:
+        return filepath, sha, optimize_image(filepath), None
     except Exception as e:
-        print(f"✗ Error optimizing {filepath}: {e}")
-        return 0, 0
+        return filepath, sha, (0, 0, []), e
 
-def main():
+def load_manifest():
+    """(settings, stem -> {"sha256": source hash, "widths": variant widths}) of the last run"""
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None, {}
+    return manifest.get("settings"), manifest.get("images", {})
+
+def previous_widths(image):
+    # manifests from before variants were named by their real width only kept the source hash
+    return image["widths"] if isinstance(image, dict) else WIDTHS
+
+def remove_variants(stem, widths):
+    for path in variant_paths(stem, widths):
+        if os.path.exists(path):
+            os.remove(path)
+
+def save_manifest(images):
+    tmp = f"{MANIFEST_PATH}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({"settings": SETTINGS, "images": dict(sorted(images.items()))}, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+def optimize_photos(workers=None, force=False):
+    """Bring the variants of every photo in FIGHTERS_DIR up to date, `workers` processes (default: one per core)"""
     if not os.path.exists(FIGHTERS_DIR):
         print(f"Error: Directory not found: {FIGHTERS_DIR}")
         return
+    os.makedirs(OUT_DIR, exist_ok=True)
 
-    image_files = glob.glob(os.path.join(FIGHTERS_DIR, "*.jpg"))
-
+    image_files = sorted(glob.glob(os.path.join(FIGHTERS_DIR, "*.jpg")))
     if not image_files:
         print("No images found to optimize")
         return
 
-    print(f"Optimizing {len(image_files)} fighter photos...\n")
+    settings, previous = load_manifest()
+    # variants made with other settings don't count
+    done = previous if settings == SETTINGS and not force else {}
+    images = {}
+    todo = []
+    for filepath in image_files:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        sha = source_sha256(filepath)
+        image = done.get(stem)
+        if image and image["sha256"] == sha and all(os.path.exists(p) for p in variant_paths(stem, image["widths"])):
+            images[stem] = image
+        else:
+            todo.append((filepath, sha))
+
+    # variants of photos that are gone
+    stems = {os.path.splitext(os.path.basename(p))[0] for p in image_files}
+    for stem in set(previous) - stems:
+        remove_variants(stem, previous_widths(previous[stem]))
+
+    print(f"Optimizing {len(todo)} of {len(image_files)} fighter photos ({len(image_files) - len(todo)} unchanged)...\n")
 
     total_before = 0
     total_after = 0
-
-    for filepath in sorted(image_files):
-        before, after = optimize_image(filepath)
-        total_before += before
-        total_after += after
-
-    total_reduction = ((total_before - total_after) / total_before) * 100 if total_before > 0 else 0
+    variants = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for filepath, sha, (before, after, widths), error in pool.map(_optimize, todo, chunksize=8):
+                if error is not None:
+                    print(f"✗ Error optimizing {filepath}: {error}")
+                    continue
+                stem = os.path.splitext(os.path.basename(filepath))[0]
+                # a new source of another size leaves variants at widths it no longer has
+                if stem in previous:
+                    remove_variants(stem, set(previous_widths(previous[stem])) - set(widths))
+                images[stem] = {"sha256": sha, "widths": widths}
+                total_before += before
+                total_after += after
+                variants += len(widths) * len(FORMATS)
+    save_manifest(images)
 
     print(f"\n✓ Complete!")
-    print(f"Total size: {total_before//1024//1024}MB → {total_after//1024//1024}MB")
-    print(f"Saved: {(total_before - total_after)//1024//1024}MB (-{total_reduction:.1f}%)")
+    print(f"Sources: {total_before//1024}KB → {variants} variants, {total_after//1024}KB total "
+          f"({total_after/max(variants, 1)/1024:.1f}KB per variant on average)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Resize and compress fighter photos into web variants")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="redo every photo, even unchanged ones")
+    args = parser.parse_args()
+    optimize_photos(args.workers, args.force)
 
 if __name__ == "__main__":
     main()
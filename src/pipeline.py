@@ -0,0 +1,114 @@
+"""
+Stage runner for the update pipeline.
+
+Each stage declares its input and output files. A stage runs after every stage that
+outputs one of its inputs, independent stages run side by side, and a stage is skipped
+when the content hashes of its inputs and outputs match its last successful run.
+Stages that read the network are marked always, their inputs can't be hashed.
+"""
+import os, glob, json, time, hashlib, subprocess, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from publish import write_json_atomic
+from instrument import span
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(ROOT, "data", "pipeline_state.json")
+
+class Stage:
+    """run is a function called in-process, or a command list run as a subprocess.
+    inputs and outputs are paths or glob patterns relative to the repo root."""
+
+    def __init__(self, name, run, inputs=(), outputs=(), after=(), always=False):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.always = always
+
+def files_digest(patterns):
+    """sha256 over the names and contents of every file the patterns match, missing ones included"""
+    h = hashlib.sha256()
+    for pattern in patterns:
+        paths = sorted(glob.glob(os.path.join(ROOT, pattern))) if glob.has_magic(pattern) else [os.path.join(ROOT, pattern)]
+        for path in paths:
+            h.update(os.path.relpath(path, ROOT).encode() + b"\0")
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        h.update(chunk)
+            except FileNotFoundError:
+                h.update(b"missing")
+            h.update(b"\0")
+    return h.hexdigest()
+
+def dependencies(stages):
+    """stage name -> names of the stages it waits for"""
+    producers = {out: s.name for s in stages for out in s.outputs}
+    deps = {}
+    for s in stages:
+        deps[s.name] = set(s.after) | {producers[i] for i in s.inputs if i in producers and producers[i] != s.name}
+    # a cycle would leave stages waiting forever
+    done = set()
+    while len(done) < len(stages):
+        ready = [n for n in deps if n not in done and deps[n] <= done]
+        if not ready:
+            raise ValueError(f"Stage dependency cycle among: {', '.join(sorted(set(deps) - done))}")
+        done.update(ready)
+    return deps
+
+def run_pipeline(stages, force=False, workers=4, state_path=STATE_PATH):
+    """Run the stages in dependency order, returns {name: "ran" | "skipped" | "failed" | "blocked"}.
+    A failed stage blocks everything after it, the rest still runs."""
+    deps = dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {}
+    lock = threading.Lock()
+    status = {}
+
+    def execute(stage):
+        inputs = files_digest(stage.inputs)
+        last = state.get(stage.name)
+        if (not force and not stage.always and last is not None
+                and last["inputs"] == inputs and last["outputs"] == files_digest(stage.outputs)):
+            print(f"[{stage.name}] up to date, skipped")
+            return "skipped"
+        print(f"[{stage.name}] running")
+        with span(f"pipeline.{stage.name}") as s:
+            if callable(stage.run):
+                stage.run()
+            else:
+                subprocess.run(stage.run, cwd=ROOT, check=True)
+        print(f"[{stage.name}] done in {s.record['wall_ms'] / 1000:.1f}s")
+        with lock:
+            # inputs as they were when the stage started, a change made meanwhile reruns it next time
+            state[stage.name] = {"inputs": inputs, "outputs": files_digest(stage.outputs), "finished": time.time()}
+            write_json_atomic(state, state_path)
+        return "ran"
+
+    pending = dict(deps)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in [n for n, d in pending.items() if d <= set(status)]:
+                del pending[name]
+                if any(status[d] in ("failed", "blocked") for d in deps[name]):
+                    print(f"[{name}] blocked by a failed stage")
+                    status[name] = "blocked"
+                else:
+                    running[pool.submit(execute, by_name[name])] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    status[name] = future.result()
+                except (Exception, SystemExit) as e:
+                    print(f"[{name}] failed: {e!r}")
+                    status[name] = "failed"
+    return status
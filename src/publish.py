@@ -0,0 +1,88 @@
+"""
+Atomic publication of the tracker outputs as one versioned release.
+
+A release is a directory data/releases/<version> holding a copy of every output plus a
+manifest. It is assembled under a temporary name and renamed into place, then
+data/manifest.json is replaced in one step to point at it. Readers that follow the
+manifest never see a half-written file or a mix of two runs.
+"""
+import os, json, time, shutil, hashlib
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+MANIFEST_NAME = "manifest.json"
+KEEP_RELEASES = 3  # older releases are deleted, the one the manifest points to is always kept
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def write_json_atomic(data, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _fsync_dir(path):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def read_manifest(data_dir=DATA_DIR):
+    """The published manifest, or None if nothing was published yet"""
+    try:
+        with open(os.path.join(data_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def publish_release(paths, info=None, data_dir=DATA_DIR, keep=KEEP_RELEASES):
+    """Copy `paths` into a new release and point the manifest at it, returns the manifest.
+
+    The version is a hash of the contents, so publishing unchanged outputs reuses the release.
+    """
+    files = {os.path.basename(p): {"sha256": file_sha256(p), "bytes": os.path.getsize(p)} for p in paths}
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:16]
+    releases = os.path.join(data_dir, "releases")
+    manifest = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "path": f"releases/{version}",
+        "files": files,
+        **(info or {}),
+    }
+
+    final = os.path.join(releases, version)
+    if not os.path.isdir(final):
+        tmp = os.path.join(releases, f".tmp-{version}-{os.getpid()}")
+        os.makedirs(tmp)
+        for p in paths:
+            shutil.copyfile(p, os.path.join(tmp, os.path.basename(p)))
+            with open(os.path.join(tmp, os.path.basename(p)), "rb") as f:
+                os.fsync(f.fileno())
+        write_json_atomic(manifest, os.path.join(tmp, MANIFEST_NAME))
+        _fsync_dir(tmp)
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            # another run published the same contents first
+            shutil.rmtree(tmp, ignore_errors=True)
+        _fsync_dir(releases)
+
+    write_json_atomic(manifest, os.path.join(data_dir, MANIFEST_NAME))
+    prune_releases(releases, version, keep)
+    return manifest
+
+def prune_releases(releases, current, keep=KEEP_RELEASES):
+    versions = sorted((d for d in os.listdir(releases) if not d.startswith(".")),
+                      key=lambda d: os.path.getmtime(os.path.join(releases, d)), reverse=True)
+    for version in versions[keep:]:
+        if version != current:
+            shutil.rmtree(os.path.join(releases, version), ignore_errors=True)
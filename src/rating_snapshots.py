@@ -0,0 +1,100 @@
+"""
+Reader for elo_snapshots.npz, the ratings as of any date. Needs only numpy, the web app
+answers as_of requests with it; elo_engine writes the file.
+"""
+import json
+import numpy as np
+from elo_kernel import FIGHTER_STATE, retirement_threshold_days, new_state, fighter_id, replay, current_ratings
+
+# per-fight replay inputs kept in the snapshot file, then the keyframe, delta and champion arrays
+SNAPSHOT_FIGHT_KEYS = ["date", "f1", "f2", "result", "method", "round", "is_title", "is_main", "weight_class"]
+SNAPSHOT_KEYS = (SNAPSHOT_FIGHT_KEYS + ["kf_fight", "kf_date", "kf_names", "d_kf", "d_id"]
+                 + [f"d_{key}" for key in FIGHTER_STATE] + ["c_kf", "c_weight_class", "c_id"])
+
+class RatingSnapshots:
+    """Ratings as of any date, from the nearest snapshot in elo_snapshots.npz plus the few fights after it"""
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as z:
+            self.data = {key: z[key] for key in z.files}
+        self.params = json.loads(str(self.data["params"]))
+        self.names = self.data["names"].tolist()
+
+    def day_of(self, date):
+        """`date` as days since the epoch, clamped to the day before the first fight .. the day everyone counts as
+        retired. Boards don't change outside that range, and far off dates (0001-01-01, 9999-12-31) can't overflow"""
+        day = int(np.datetime64(date, "D").astype(np.int64))
+        dates = self.data["date"][self.data["date"] != np.iinfo(np.int64).max]
+        if len(dates):
+            day = min(max(day, int(dates[0]) - 1), int(dates[-1]) + retirement_threshold_days)
+        return day
+
+    def state_as_of(self, date):
+        """Replay state after every fight on or before `date`, plus each fighter's last fight index"""
+        z = self.data
+        day = self.day_of(date)
+        k = np.searchsorted(z["kf_date"], day, side="right") - 1
+        start, end = z["kf_fight"][k], np.searchsorted(z["date"], day, side="right")
+
+        state = new_state(self.params)
+        n = int(z["kf_names"][k])
+        state["names"] = self.names[:n]
+        starting = {"elo": self.params["initial_elo"], "peak": float("-inf")}
+        rows = np.flatnonzero(z["d_kf"] <= k)
+        ids = z["d_id"][rows].astype(int)
+        # rows are in keyframe order, keep each fighter's last one
+        _, last_rev = np.unique(ids[::-1], return_index=True)
+        rows, ids = rows[len(rows) - 1 - last_rev], ids[len(ids) - 1 - last_rev]
+        for key in FIGHTER_STATE:
+            values = np.full(n, starting.get(key, 0), dtype=float)
+            values[ids] = z[f"d_{key}"][rows]
+            state[key] = values.tolist() if key in ("elo", "peak", "elo_sum") else values.astype(int).tolist()
+        champs = z["c_kf"] == k
+        state["current_champions"] = dict(zip(z["c_weight_class"][champs].tolist(), z["c_id"][champs].astype(int).tolist()))
+        state["n_fights"] = int(start)
+
+        if end > start:
+            # fighters making their debut get interned pairwise, in the same order as the full replay
+            ids = [(fighter_id(state, self.names[a]), fighter_id(state, self.names[b]))
+                   for a, b in zip(z["f1"][start:end], z["f2"][start:end])]
+            weight_classes = z["weight_classes"]
+            replay(state, {
+                "f1": [a for a, _ in ids],
+                "f2": [b for _, b in ids],
+                "result": z["result"][start:end].tolist(),
+                "method": z["method"][start:end].tolist(),
+                "round": z["round"][start:end].tolist(),
+                "is_title": z["is_title"][start:end].tolist(),
+                "is_main": z["is_main"][start:end].tolist(),
+                "weight_class": weight_classes[z["weight_class"][start:end]].tolist(),
+                "fight_url": [""] * (end - start),
+            })
+
+        last = np.full(len(state["names"]), -1)
+        np.maximum.at(last, z["f1"][:end], np.arange(end))
+        np.maximum.at(last, z["f2"][:end], np.arange(end))
+        return state, last
+
+    def current(self, date):
+        """Current leaderboard the way it stood on `date`, records in the layout of current_elo_2.0.json.
+
+        Champions come from the title fight lineage of the replay, manual_champions.csv only describes today.
+        """
+        state, last = self.state_as_of(date)
+        z = self.data
+        n = len(state["names"])
+        is_champion = np.isin(np.arange(n), list(state["current_champions"].values()))
+        last_day = z["date"][last]
+        elo, _, _, status, active = current_ratings(
+            state["elo"], last_day.astype("datetime64[D]"), np.datetime64(self.day_of(date), "D"), is_champion,
+            state["wins"], state["losses"], state["title_defenses"], state["former_champions"], self.params)
+        weight_classes = z["weight_classes"][z["weight_class"][last]]
+        return [{
+            "Fighter": state["names"][i],
+            # to_json's precision, like the exported file
+            "Elo": round(float(elo[i]), 10),
+            "Last_Fight": int(last_day[i]) * 86400000,
+            "Weight Class": str(weight_classes[i]),
+            "Status": status[i],
+            "Record": f"{state['wins'][i]}-{state['losses'][i]}-{state['draws'][i]}",
+        } for i in np.flatnonzero(active)[np.argsort(-elo[active], kind="stable")]]
@@ -1,115 +1,191 @@
-import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from requests import HTTPError
+from fetch import Fetcher, default_fetcher, DAY
+from publish import read_manifest, write_json_atomic
+import argparse
+import hashlib
 import os
 import json
 import time
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 FRONTEND_PUBLIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend", "public", "fighters")
-HEADERS = {"User-Agent": "Mozilla/5.0"}
+MAPPING_PATH = os.path.join(FRONTEND_PUBLIC, "fighter_photos.json")
+# slug -> when it was last checked, the image url and the sha256 of the saved photo (None when there's no photo)
+STATE_PATH = os.path.join(DATA_DIR, "photo_sync.json")
+ATHLETE_URL = "https://www.ufc.com/athlete/"
+SAVE_EVERY = 50  # fighters between writes of the mapping and state
 
 os.makedirs(FRONTEND_PUBLIC, exist_ok=True)
 
 def get_fighter_slug(name):
     """Convert fighter name"""
     slug = name.lower().replace(" ", "-")
-    
+
     slug = ''.join(c for c in slug if c.isalnum() or c == '-')
     return slug
 
-def scrape_fighter_photo(fighter_name):
-    """Download fighter photo"""
-    slug = get_fighter_slug(fighter_name)
-    url = f"https://www.ufc.com/athlete/{slug}"
-
+def find_photo_url(html):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    img_tag = soup.find('img', class_='hero-profile__image')
+    if not img_tag:
+        img_tag = soup.find('img', class_='c-hero__image')
+    if not img_tag:
+        for img in soup.find_all('img'):
+            src = img.get('src', '')
+            if 'athlete' in src or 'fighter' in src:
+                img_tag = img
+                break
+
+    if img_tag and img_tag.get('src'):
+        img_url = img_tag['src']
+        if not img_url.startswith('http'):
+            img_url = 'https://www.ufc.com' + img_url
+        return img_url
+    return None
+
+def file_sha256(path):
     try:
-        print(f"Fetching photo for {fighter_name}...")
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        img_tag = None
-
-        img_tag = soup.find('img', class_='hero-profile__image')
-        if not img_tag:
-            img_tag = soup.find('img', class_='c-hero__image')
-        if not img_tag:
-            for img in soup.find_all('img'):
-                src = img.get('src', '')
-                if 'athlete' in src or 'fighter' in src:
-                    img_tag = img
-                    break
-
-        if img_tag and img_tag.get('src'):
-            img_url = img_tag['src']
-            if not img_url.startswith('http'):
-                img_url = 'https://www.ufc.com' + img_url
-
-            img_response = requests.get(img_url, headers=HEADERS, timeout=10)
-            img_response.raise_for_status()
-
-            filename = f"{slug}.jpg"
-            filepath = os.path.join(FRONTEND_PUBLIC, filename)
-
-            with open(filepath, 'wb') as f:
-                f.write(img_response.content)
-
-            print(f"✓ Downloaded photo for {fighter_name}")
-            return filename
-        else:
-            print(f"✗ No photo found for {fighter_name}")
-            return None
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
 
+def sync_photo(fighter_name, fetcher, known=None):
+    """Fetch a fighter's photo, the file is only rewritten when the image changed.
+    Returns the new state entry, see STATE_PATH"""
+    slug = get_fighter_slug(fighter_name)
+    filepath = os.path.join(FRONTEND_PUBLIC, f"{slug}.jpg")
+    entry = {"checked": time.time(), "image": None, "sha256": None}
+    try:
+        html = fetcher.get(ATHLETE_URL + slug, ttl=7 * DAY).text
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return entry  # no athlete page, checked again once this entry goes stale
+        raise
+
+    img_url = find_photo_url(html)
+    if img_url is None:
+        return entry
+    # cached images are revalidated with a conditional GET
+    content = fetcher.get(img_url, ttl=30 * DAY).content
+    entry.update(image=img_url, sha256=hashlib.sha256(content).hexdigest())
+
+    current = known.get("sha256") if known and os.path.exists(filepath) else file_sha256(filepath)
+    if current != entry["sha256"]:
+        tmp = f"{filepath}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, filepath)
+        entry["updated"] = True
+    return entry
+
+def scrape_fighter_photo(fighter_name, fetcher=None):
+    """Download fighter photo"""
+    print(f"Fetching photo for {fighter_name}...")
+    try:
+        entry = sync_photo(fighter_name, fetcher or default_fetcher())
     except Exception as e:
         print(f"✗ Error fetching {fighter_name}: {str(e)}")
         return None
+    if entry["sha256"] is None:
+        print(f"✗ No photo found for {fighter_name}")
+        return None
+    print(f"✓ Downloaded photo for {fighter_name}")
+    return f"{get_fighter_slug(fighter_name)}.jpg"
 
-def main():
-    elo_current_path = os.path.join(DATA_DIR, "elo_current.json")
-    elo_peak_path = os.path.join(DATA_DIR, "elo_peak.json")
-
-    if not os.path.exists(elo_current_path):
-        print("Error: elo_current.json not found")
-        return
-
-    if not os.path.exists(elo_peak_path):
-        print("Error: elo_peak.json not found")
-        return
-
-    with open(elo_current_path, 'r') as f:
-        current_fighters = json.load(f)
-
-    with open(elo_peak_path, 'r') as f:
-        peak_fighters = json.load(f)
-
-    top_current = current_fighters[:25]
-    top_peak = peak_fighters[:25]
-
-    fighters_dict = {}
-    for fighter in top_current + top_peak:
-        fighters_dict[fighter['Fighter']] = fighter
-
-    top_fighters = list(fighters_dict.values())
-
-    print(f"\nScraping photos for {len(top_fighters)} unique fighters (from top 25 current + top 25 peak)...\n")
-
-    results = {}
-    for fighter in top_fighters:
-        fighter_name = fighter['Fighter']
-        filename = scrape_fighter_photo(fighter_name)
-        if filename:
-            results[fighter_name] = filename
-
-        time.sleep(1)
-
-    mapping_path = os.path.join(FRONTEND_PUBLIC, "fighter_photos.json")
-    with open(mapping_path, 'w') as f:
-        json.dump(results, f, indent=2)
-
-    print(f"\n✓ Complete! Downloaded {len(results)} photos")
+def load_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def roster(top=None):
+    """Fighter names from the current then the peak leaderboard, `top` of each (all by default), deduplicated by photo file"""
+    # the published release when there is one, the tracker may be rewriting the flat exports right now
+    manifest = read_manifest(DATA_DIR)
+    directory = os.path.join(DATA_DIR, manifest["path"]) if manifest else DATA_DIR
+    names = {}
+    for filename in ("current_elo_2.0.json", "peak_elo_2.0.json"):
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            raise SystemExit(f"Error: {filename} not found, run the tracker first")
+        for fighter in load_json(path, [])[:top]:
+            names.setdefault(get_fighter_slug(fighter['Fighter']), fighter['Fighter'])
+    return list(names.values())
+
+def sync_photos(top=None, workers=8, rate=5.0, max_age=30, cache=True, offline=False):
+    """Bring the photos of the tracked fighters up to date.
+
+    Fighters checked within `max_age` days whose photo file is still there (or who had no photo)
+    are skipped without a request. The rest are fetched through a pool of `workers` threads, at
+    most `rate` requests/second per host, through the shared HTTP cache. The mapping and the
+    state are saved every SAVE_EVERY fighters, an interrupted run keeps what it got.
+    """
+    fighters = roster(top)
+    mapping = load_json(MAPPING_PATH, {})
+    state = load_json(STATE_PATH, {})
+
+    def fresh(name):
+        entry = state.get(get_fighter_slug(name))
+        if entry is None or time.time() - entry["checked"] > max_age * DAY:
+            return False
+        return entry["sha256"] is None or os.path.exists(os.path.join(FRONTEND_PUBLIC, f"{get_fighter_slug(name)}.jpg"))
+
+    todo = [name for name in fighters if not fresh(name)]
+    print(f"{len(todo)} of {len(fighters)} fighters to check ({len(fighters) - len(todo)} fresh)")
+
+    fetcher = Fetcher(workers, rate, cache=cache, offline=offline)
+
+    def fetch(name):
+        try:
+            return sync_photo(name, fetcher, state.get(get_fighter_slug(name))), None
+        except Exception as e:
+            return None, e
+
+    def save():
+        write_json_atomic(mapping, MAPPING_PATH)
+        write_json_atomic(state, STATE_PATH)
+
+    counts = {"updated": 0, "unchanged": 0, "missing": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for idx, (name, (entry, error)) in enumerate(zip(todo, pool.map(fetch, todo))):
+            slug = get_fighter_slug(name)
+            if error is not None:
+                # not recorded, so it's retried next run
+                print(f"✗ Error fetching {name}: {error}")
+                counts["failed"] += 1
+            elif entry["sha256"] is None:
+                state[slug] = entry
+                mapping.pop(name, None)
+                counts["missing"] += 1
+            else:
+                counts["updated" if entry.pop("updated", False) else "unchanged"] += 1
+                state[slug] = entry
+                mapping[name] = f"{slug}.jpg"
+            if (idx + 1) % SAVE_EVERY == 0:
+                print(f"Checked {idx + 1}/{len(todo)} fighters")
+                save()
+    save()
+
+    print(f"\n✓ Complete! {counts['updated']} photos downloaded, {counts['unchanged']} unchanged, "
+          f"{counts['missing']} without a photo, {counts['failed']} failed")
     print(f"✓ Saved to: {FRONTEND_PUBLIC}")
-    print(f"✓ Mapping saved to: {mapping_path}")
+    print(f"✓ Mapping saved to: {MAPPING_PATH}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Download ufc.com photos for the fighters on the Elo leaderboards")
+    parser.add_argument("--top", type=int, help="only the top N of the current and peak leaderboards (default: everyone)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent fetches")
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second per host")
+    parser.add_argument("--max-age", type=float, default=30, help="days before a fighter's photo is checked again")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the HTTP cache")
+    parser.add_argument("--offline", action="store_true", help="only use pages and images from the HTTP cache")
+    args = parser.parse_args()
+    sync_photos(args.top, args.workers, args.rate, args.max_age, not args.no_cache, args.offline)
 
 if __name__ == "__main__":
     main()
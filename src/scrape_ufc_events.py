@@ -1,22 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
+from fetch import Fetcher, get_soup
+from instrument import traced
 import pandas as pd
-import os
+import os, argparse
 
 URL = "http://ufcstats.com/statistics/events/completed?page=all"
-HEADERS = {"User-Agent": "Mozilla/5.0"}
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 OUT_PATH = os.path.join(DATA_DIR, "ufc_events.csv")
 
-def get_soup(url):
-    res = requests.get(url, headers=HEADERS, timeout=10)
-    res.raise_for_status()
-    return BeautifulSoup(res.text, "html.parser")
-
-def scrape_ufc_events():
-    soup = get_soup(URL)
+@traced("scrape.events")
+def scrape_ufc_events(fetcher=None):
+    soup = get_soup(URL, fetcher)
 
     rows = soup.select('tr.b-statistics__table-row')
 
@@ -45,5 +40,8 @@ def scrape_ufc_events():
     return df
 
 if __name__ == "__main__":
-    df = scrape_ufc_events()
+    parser = argparse.ArgumentParser(description="Scrape the list of completed UFC events")
+    parser.add_argument("--offline", action="store_true", help="only replay the page from the HTTP cache")
+    args = parser.parse_args()
+    df = scrape_ufc_events(Fetcher(offline=args.offline))
     print(df.head(10))
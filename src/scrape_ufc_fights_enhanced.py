@@ -1,103 +1,239 @@
-import requests
+from fetch import Fetcher, default_fetcher, REVALIDATE, IMMUTABLE
 from bs4 import BeautifulSoup
+import lxml.html
+from instrument import span, traced
+from storage import read_table, write_table, parquet_path, typed_fights, fights_csv
 import pandas as pd
-import os
-from time import sleep
+import os, json, argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-HEADERS = {"User-Agent": "Mozilla/5.0"}
 EVENTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ufc_events.csv")
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 OUT_PATH = os.path.join(DATA_DIR, "fights_enhanced.csv")
 
-def get_soup(url):
-    res = requests.get(url, headers=HEADERS, timeout=10)
-    res.raise_for_status()
-    return BeautifulSoup(res.text, "html.parser")
-
-def parse_event_fights(event_name, event_date, event_url):
-    soup = get_soup(event_url)
-    rows = soup.find_all("tr", class_="b-fight-details__table-row b-fight-details__table-row__hover js-fight-details-click")
+COLUMNS = [
+    "Event", "Date", "Weight Class", "Fighter 1", "Fighter 2",
+    "Winner", "Method", "Round", "Time", "Event URL", "Fight URL", "method",
+    "Is_Title_Fight", "Is_Main_Event"
+]
+
+def event_ttl(event_date):
+    """Results can still change for a few weeks after a card, after that the page never does"""
+    try:
+        age = datetime.now() - datetime.strptime(event_date, "%B %d, %Y")
+    except (TypeError, ValueError):
+        return REVALIDATE
+    return IMMUTABLE if age.days > 30 else REVALIDATE
+
+FIGHT_ROW_CLASS = "b-fight-details__table-row b-fight-details__table-row__hover js-fight-details-click"
+FIGHTER_LINK_CLASS = "b-link b-link_style_black"
+
+def fight_record(event_name, event_date, event_url, idx, cells, is_title_fight, fighters, results, fight_url):
+    """One output row from the pieces a parser pulled out of a fight table row"""
+    weight_class = cells[6].replace("Title Bout", "").replace("Championship", "").strip()
+    is_main_event = (idx == 0)
+
+    fighter1, fighter2 = fighters[:2]
+    if len(results) >= 1 and "win" in results[0]:
+        winner = fighter1
+    elif len(results) >= 2 and "win" in results[1]:
+        winner = fighter2
+    else:
+        winner = "Draw"
+
+    if winner == fighter2:
+        fighter1, fighter2 = fighter2, fighter1
+
+    method = cells[7]
+    if "KO" in method:
+        simplified_method = "KO"
+    elif "SUB" in method:
+        simplified_method = "SUB"
+    else:
+        simplified_method = "DEC"
+
+    return [
+        event_name, event_date, weight_class, fighter1, fighter2,
+        winner, method, cells[8], cells[9], event_url, fight_url, simplified_method,
+        is_title_fight, is_main_event
+    ]
+
+def _text(el):
+    # same as bs4's get_text(strip=True): every text node stripped and joined, comments skipped
+    return "".join(t.strip() for t in el.xpath(".//text()"))
+
+def _has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+def parse_fights_lxml(html, event_name, event_date, event_url):
+    """Fight rows of an event page, read straight off the lxml tree with XPath"""
+    doc = lxml.html.document_fromstring(html)
     fights = []
+    for idx, row in enumerate(doc.xpath(f'//tr[normalize-space(@class) = "{FIGHT_ROW_CLASS}"]')):
+        cols = row.xpath(".//td")
+        if len(cols) < 10:
+            continue
+        fighters = [_text(a) for a in row.xpath(f'.//a[normalize-space(@class) = "{FIGHTER_LINK_CLASS}"]')]
+        if len(fighters) < 2:
+            continue
+        results = [_text(i).lower() for i in row.xpath(f".//i[{_has_class('b-flag__text')}]")]
+        is_title_fight = bool(cols[6].xpath('.//img[contains(@src, "belt.png")]'))
+        cells = [_text(td) for td in cols[:10]]
+        fights.append(fight_record(event_name, event_date, event_url, idx, cells, is_title_fight,
+                                   fighters, results, (row.get("data-link") or "").strip()))
+    return fights
 
-    for idx, row in enumerate(rows):
+def parse_fights_soup(html, event_name, event_date, event_url):
+    """Reference BeautifulSoup parser, slower but tolerant of anything; kept to check the lxml one against"""
+    soup = BeautifulSoup(html, "html.parser")
+    fights = []
+    for idx, row in enumerate(soup.find_all("tr", class_=FIGHT_ROW_CLASS)):
         cols = row.find_all("td")
         if not cols or len(cols) < 10:
             continue
-
-        weight_class_col = cols[6]
-        weight_class_text = weight_class_col.get_text(strip=True)
-
-        belt_img = weight_class_col.find("img", src=lambda x: x and "belt.png" in x)
-        is_title_fight = belt_img is not None
-
-        weight_class = weight_class_text.replace("Title Bout", "").replace("Championship", "").strip()
-
-        is_main_event = (idx == 0)
-
-        fighter_tags = row.find_all("a", class_="b-link b-link_style_black")
+        fighter_tags = row.find_all("a", class_=FIGHTER_LINK_CLASS)
         if len(fighter_tags) < 2:
             continue
-        fighter1, fighter2 = [t.get_text(strip=True) for t in fighter_tags[:2]]
-
-        flags = row.select("i.b-flag__text")
-        results = [f.get_text(strip=True).lower() for f in flags]
-        if len(results) >= 1 and "win" in results[0]:
-            winner = fighter1
-        elif len(results) >= 2 and "win" in results[1]:
-            winner = fighter2
-        else:
-            winner = "Draw"
-
-        if winner == fighter2:
-            fighter1, fighter2 = fighter2, fighter1
-
-        method = cols[7].get_text(strip=True)
-        if "KO" in method:
-            simplified_method = "KO"
-        elif "SUB" in method:
-            simplified_method = "SUB"
-        else:
-            simplified_method = "DEC"
-
-        round_ = cols[8].get_text(strip=True)
-        time_ = cols[9].get_text(strip=True)
-        fight_url = row.get("data-link", "").strip()
-
-        fights.append([
-            event_name, event_date, weight_class, fighter1, fighter2,
-            winner, method, round_, time_, event_url, fight_url, simplified_method,
-            is_title_fight, is_main_event
-        ])
+        fighters = [t.get_text(strip=True) for t in fighter_tags]
+        results = [f.get_text(strip=True).lower() for f in row.select("i.b-flag__text")]
+        is_title_fight = cols[6].find("img", src=lambda x: x and "belt.png" in x) is not None
+        cells = [td.get_text(strip=True) for td in cols[:10]]
+        fights.append(fight_record(event_name, event_date, event_url, idx, cells, is_title_fight,
+                                   fighters, results, row.get("data-link", "").strip()))
     return fights
 
-def scrape_all_fights():
-    events = pd.read_csv(EVENTS_PATH)
-    all_fights = []
-    for idx, row in events.iterrows():
-        event_name = row["Event"]
-        event_date = row["Date"]
-        event_url = row["URL"]
+PARSERS = {"lxml": parse_fights_lxml, "soup": parse_fights_soup}
+
+def parse_event_fights(event_name, event_date, event_url, fetcher=None, ttl=None, parser="lxml"):
+    with span("scrape.event", parser=parser) as s:
+        html = (fetcher or default_fetcher()).get(event_url, event_ttl(event_date) if ttl is None else ttl).text
+        fights = PARSERS[parser](html, event_name, event_date, event_url)
+        s.set(rows=len(fights))
+        return fights
+
+def events_to_scrape(events, existing, recheck=0):
+    """Events missing from the existing fights, plus the `recheck` most recent ones already scraped"""
+    done = set(existing["Event URL"])
+    # ufc_events.csv lists the newest events first
+    recent = [url for url in events["URL"] if url in done][:recheck]
+    return events[~events["URL"].isin(done) | events["URL"].isin(recent)].reset_index(drop=True)
+
+def merge_fights(existing, fights, replaced_urls, events):
+    """Swap the rows of re-scraped events into the existing fights, keeping ufc_events.csv order"""
+    df = typed_fights(pd.DataFrame(fights, columns=COLUMNS))
+    df = df.drop_duplicates(subset=["Fight URL", "Event", "Fighter 1", "Fighter 2"], keep="last")
+    if existing is not None:
+        df = pd.concat([df, existing[~existing["Event URL"].isin(replaced_urls)]], ignore_index=True)
+    df = df.drop_duplicates(subset=["Fight URL", "Event", "Fighter 1", "Fighter 2"], keep="first")
+    order = df["Event URL"].map({url: i for i, url in enumerate(events["URL"])}).fillna(len(events))
+    # concat drops categoricals whose categories differ, put the dtypes back
+    return typed_fights(df.iloc[order.argsort(kind="stable")])
+
+def journal_path(out_path):
+    return os.path.splitext(out_path)[0] + ".journal.jsonl"
+
+def read_journal(path):
+    """Fights per event URL from an interrupted run's journal, dropping a half-written last record"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    good = 0
+    with open(path, "rb") as fp:
+        for line in fp:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            done[record["url"]] = record["fights"]
+            good += len(line)
+    # so the next append starts on a clean line
+    with open(path, "r+b") as fp:
+        fp.truncate(good)
+    return done
+
+def append_journal(fp, url, fights):
+    fp.write(json.dumps({"url": url, "fights": fights}) + "\n")
+    fp.flush()
+    os.fsync(fp.fileno())
+
+@traced("scrape.fights")
+def scrape_all_fights(workers=8, rate=5.0, incremental=False, recheck=0, cache=True, offline=False, parser="lxml"):
+    """Fetch event pages through a pool of `workers` threads, at most `rate` requests/second.
+
+    With incremental only events that aren't in fights_enhanced.csv yet (plus the `recheck`
+    most recent ones, for overturned or corrected results) are fetched and merged in.
+    Pages go through the shared HTTP cache, offline only replays what's cached.
+    Each scraped event is appended to a journal as it finishes, a rerun after a crash picks
+    those events up from the journal instead of fetching them again. The journal is
+    folded into fights_enhanced.csv once at the end and then removed.
+    """
+    all_events = pd.read_csv(EVENTS_PATH)
+    events, existing, rechecked = all_events, None, set()
+    if incremental and (os.path.exists(OUT_PATH) or os.path.exists(parquet_path(OUT_PATH))):
+        existing = read_table(OUT_PATH, typed_fights)
+        events = events_to_scrape(all_events, existing, recheck)
+        rechecked = set(events["URL"]) & set(existing["Event URL"])
+        print(f"{len(events)} of {len(all_events)} events to scrape ({len(all_events) - len(events)} already up to date)")
+    if events.empty:
+        print("Scraping complete")
+        return
+
+    fetcher = Fetcher(workers, rate, cache=cache, offline=offline)
+
+    def fetch(row):
+        # re-checked events always revalidate, however old the card is
+        ttl = REVALIDATE if row["URL"] in rechecked else None
+        try:
+            return parse_event_fights(row["Event"], row["Date"], row["URL"], fetcher, ttl, parser), None
+        except Exception as e:
+            return [], e
 
-        print(f"Scraping fights from {event_name}... ({idx + 1}/{len(events)})")
+    journal = journal_path(OUT_PATH)
+    journaled = read_journal(journal)
+    urls = events["URL"].tolist()
+    resumed = sum(url in journaled for url in urls)
+    if resumed:
+        print(f"Resuming: {resumed} events already in {journal}")
 
-        try:
-            fights = parse_event_fights(event_name, event_date, event_url)
+    all_fights = []
+    scraped_urls = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(journal, "a") as jfp:
+        # map yields in event order, so progress and the journal match the serial scraper
+        results = pool.map(fetch, [row for _, row in events.iterrows() if row["URL"] not in journaled])
+        for idx, url in enumerate(urls):
+            event_name = events.at[idx, "Event"]
+            if url in journaled:
+                fights, error = journaled[url], None
+            else:
+                fights, error = next(results)
+                if error is None:
+                    append_journal(jfp, url, fights)
+            print(f"Scraped fights from {event_name}... ({idx + 1}/{len(events)})")
+            if error is not None:
+                # a failed re-check keeps the rows we already had
+                print(f"Failed to scrape {event_name}: {error}")
+            else:
+                scraped_urls.add(url)
             all_fights.extend(fights)
-        except Exception as e:
-            print(f"Failed to scrape {event_name}: {e}")
-
-        if (idx + 1) % 25 == 0 or idx == len(events) - 1:
-            df = pd.DataFrame(all_fights, columns=[
-                "Event", "Date", "Weight Class", "Fighter 1", "Fighter 2",
-                "Winner", "Method", "Round", "Time", "Event URL", "Fight URL", "method",
-                "Is_Title_Fight", "Is_Main_Event"
-            ])
-            df = df.drop_duplicates(subset=["Fight URL", "Event", "Fighter 1", "Fighter 2"], keep="last")
-            df.to_csv(OUT_PATH, index=False)
-            print(f"Saved progress at {idx + 1}/{len(events)} events, total fights: {len(df)}")
-        sleep(0.5)
+
+    df = merge_fights(existing, all_fights, scraped_urls, all_events)
+    write_table(df, OUT_PATH, fights_csv(df))
+    os.remove(journal)
+    print(f"Saved {len(df)} fights to {OUT_PATH}")
     print("Scraping complete")
 
 if __name__ == "__main__":
-    scrape_all_fights()
+    parser = argparse.ArgumentParser(description="Scrape every fight of every completed UFC event")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent event page fetches")
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second to ufcstats.com")
+    parser.add_argument("--incremental", action="store_true", help="only scrape events missing from fights_enhanced.csv")
+    parser.add_argument("--recheck", type=int, default=0, help="with --incremental, also re-scrape the N most recent known events")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the HTTP cache")
+    parser.add_argument("--offline", action="store_true", help="only replay pages from the HTTP cache")
+    parser.add_argument("--parser", choices=sorted(PARSERS), default="lxml", help="event page parser (soup is the slow reference one)")
+    args = parser.parse_args()
+    scrape_all_fights(args.workers, args.rate, args.incremental, args.recheck, not args.no_cache, args.offline, args.parser)
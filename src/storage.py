@@ -0,0 +1,59 @@
+"""
+Typed columnar storage for the fight tables.
+Each table is kept as Parquet next to its CSV export, the CSV is only parsed when the
+Parquet copy is missing or older (fresh clone, CSV updated by git).
+"""
+import pandas as pd
+import os, threading
+
+# how ufcstats writes dates, and how fights_enhanced.csv keeps them
+FIGHT_DATE_FORMAT = "%B %d, %Y"
+
+FIGHT_DTYPES = {
+    "Weight Class": "category",
+    "Method": "category",
+    "method": "category",
+    "Round": "Int8",  # nullable, cards without results yet have no round
+    "Is_Title_Fight": "bool",
+    "Is_Main_Event": "bool",
+}
+
+def parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+def typed_fights(df):
+    """Scraped fight rows with their real dtypes, dates parsed once here. Safe to call on typed frames"""
+    df = df.copy()
+    if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df["Date"] = pd.to_datetime(df["Date"], format=FIGHT_DATE_FORMAT, errors="coerce")
+    if "Round" in df and not pd.api.types.is_integer_dtype(df["Round"]):
+        df["Round"] = pd.to_numeric(df["Round"], errors="coerce")
+    return df.astype({col: dtype for col, dtype in FIGHT_DTYPES.items() if col in df})
+
+def fights_csv(df):
+    """Typed fights back in the text form the scraper has always written"""
+    df = df.copy()
+    df["Date"] = df["Date"].dt.strftime(FIGHT_DATE_FORMAT)
+    return df
+
+def write_parquet(df, path):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def write_table(df, csv_path, csv_df=None):
+    """CSV export first, then the Parquet copy, so the Parquet is never older than its CSV"""
+    (df if csv_df is None else csv_df).to_csv(csv_path, index=False)
+    write_parquet(df, parquet_path(csv_path))
+
+def read_table(csv_path, typed=None, columns=None):
+    """Load a table from its Parquet copy, falling back to the CSV (run through `typed`) and caching it as Parquet"""
+    pq = parquet_path(csv_path)
+    if os.path.exists(pq) and (not os.path.exists(csv_path) or os.stat(pq).st_mtime_ns >= os.stat(csv_path).st_mtime_ns):
+        return pd.read_parquet(pq, columns=columns)
+    df = pd.read_csv(csv_path, usecols=columns, float_precision="round_trip")
+    if typed is not None:
+        df = typed(df)
+    if columns is None:
+        write_parquet(df, pq)
+    return df
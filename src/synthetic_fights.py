@@ -0,0 +1,185 @@
+"""
+Synthetic fight histories shaped like fights_enhanced.csv, for benchmarks.
+
+Fighters get a hidden skill and a planned career length (median of about 4 fights with a
+long tail, like the real roster) and stay in one division. The better fighter usually wins,
+about 1 in 55 fights is a draw and champions defend in five-round main events. Events are
+spread over the real 1993-2025 span, so larger histories get more events per day, like
+several promotions running at once. The same size and seed always give the same file.
+
+python synthetic_fights.py 100k --seed 1 --out fights_100k.csv
+"""
+import argparse, math, random
+from datetime import date, timedelta
+import pandas as pd
+from storage import FIGHT_DATE_FORMAT
+
+# real fight counts per division
+DIVISIONS = {
+    "Lightweight": 1425, "Welterweight": 1368, "Middleweight": 1120, "Featherweight": 829,
+    "Bantamweight": 754, "Heavyweight": 751, "Light Heavyweight": 732, "Flyweight": 394,
+    "Women's Strawweight": 357, "Women's Flyweight": 264, "Women's Bantamweight": 236,
+    "Open Weight": 117, "Women's Featherweight": 30, "Catch Weight": 76,
+}
+# scraped method -> (share of decisive fights, how ufcstats writes it)
+METHODS = {
+    "DEC": (0.48, ["U-DEC", "U-DEC", "U-DEC", "S-DEC", "M-DEC"]),
+    "KO": (0.33, ["KO/TKOPunches", "KO/TKOPunch", "KO/TKOKick", "KO/TKOElbows", "KO/TKOKnee", "KO/TKO"]),
+    "SUB": (0.19, ["SUBRear Naked Choke", "SUBGuillotine Choke", "SUBArmbar", "SUBArm Triangle", "SUBTriangle Choke"]),
+}
+DRAW_RATE = 0.018
+TITLE_MAIN_EVENT_RATE = 0.6  # main events that are title fights
+FIGHTS_PER_EVENT = 11
+MEAN_CAREER = 6.4  # fights, real roster average
+DAYS_BETWEEN_FIGHTS = 200  # typical gap in an active career
+FIRST_DATE = date(1993, 11, 12)
+END_DATE = date(2025, 11, 15)
+
+FIRST_NAMES = [
+    "Alex", "Andre", "Ben", "Bruno", "Carlos", "Chris", "Daniel", "Diego", "Dmitri", "Eddie", "Felipe",
+    "Gabriel", "Hector", "Ilia", "Islam", "Jack", "Jamal", "Jose", "Jiri", "Kamaru", "Khalil", "Leon",
+    "Luis", "Magomed", "Marcus", "Mateus", "Max", "Merab", "Mike", "Nate", "Omar", "Paulo", "Rafael",
+    "Ricardo", "Ryan", "Said", "Sean", "Sergei", "Tai", "Thiago", "Tom", "Umar", "Victor", "Yan",
+    "Amanda", "Cris", "Erin", "Jessica", "Julianna", "Kayla", "Mackenzie", "Rose", "Valentina", "Zhang",
+]
+SYLLABLES = [
+    "an", "bar", "ber", "ca", "chi", "da", "del", "dos", "ev", "fer", "gar", "go", "ha", "ko", "lam",
+    "lo", "ma", "mo", "nov", "nez", "o", "pa", "ra", "ro", "san", "si", "ta", "tos", "va", "vich", "zo",
+]
+
+def parse_size(text):
+    """10k -> 10000, 1M -> 1000000"""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+class _Roster:
+    """Active fighters of one division, with O(1) pick and retire"""
+
+    def __init__(self):
+        self.fighters = []
+
+    def pick(self, rng):
+        return self.fighters[rng.randrange(len(self.fighters))]
+
+    def retire(self, fighter):
+        i = fighter["slot"]
+        last = self.fighters.pop()
+        if last is not fighter:
+            self.fighters[i] = last
+            last["slot"] = i
+
+    def add(self, fighter):
+        fighter["slot"] = len(self.fighters)
+        self.fighters.append(fighter)
+
+def generate_fights(n_fights, seed=0):
+    """n_fights synthetic fights as a DataFrame with the columns and text formats of fights_enhanced.csv"""
+    rng = random.Random(seed)
+    names = set()
+    divisions = list(DIVISIONS)
+    weights = list(DIVISIONS.values())
+    total_weight = sum(weights)
+
+    span_days = (END_DATE - FIRST_DATE).days
+    # enough active fighters per division that each fights about every DAYS_BETWEEN_FIGHTS days
+    fights_per_day = n_fights / span_days
+    pool = {d: max(4, round(2 * fights_per_day * DAYS_BETWEEN_FIGHTS * w / total_weight)) for d, w in DIVISIONS.items()}
+
+    def new_name():
+        while True:
+            last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+            name = f"{rng.choice(FIRST_NAMES)} {last}"
+            if name not in names:
+                names.add(name)
+                return name
+
+    def new_fighter():
+        return {"name": new_name(), "skill": rng.gauss(0, 1), "left": 1 + int(rng.expovariate(1 / (MEAN_CAREER - 1)))}
+
+    rosters = {}
+    for d in divisions:
+        rosters[d] = _Roster()
+        for _ in range(pool[d]):
+            rosters[d].add(new_fighter())
+    champions = {}
+
+    def contender(d, avoid=None):
+        # best of a few random picks, so title shots go to good fighters
+        picks = [rosters[d].pick(rng) for _ in range(8)]
+        picks = [p for p in picks if p is not avoid] or [p for p in rosters[d].fighters if p is not avoid]
+        return max(picks, key=lambda p: p["skill"])
+
+    events = []
+    made = 0
+    while made < n_fights:
+        e = len(events)
+        # dates follow progress through the history, so it always ends on END_DATE
+        day = FIRST_DATE + timedelta(days=made * span_days // n_fights)
+        n_bouts = max(1, min(FIGHTS_PER_EVENT + rng.randint(-3, 3), n_fights - made))
+        bouts = []
+        for b in range(n_bouts):
+            d = rng.choices(divisions, weights)[0]
+            title = b == 0 and rng.random() < TITLE_MAIN_EVENT_RATE
+            if title:
+                champ = champions.get(d)
+                f1 = champ if champ is not None and champ.get("slot") is not None else contender(d)
+                f2 = contender(d, avoid=f1)
+            else:
+                f1 = rosters[d].pick(rng)
+                f2 = rosters[d].pick(rng)
+                while f2 is f1:
+                    f2 = rosters[d].pick(rng)
+            rounds = 5 if b == 0 else 3
+
+            if rng.random() < DRAW_RATE:
+                winner, loser, method = f1, f2, "DRAW"
+            else:
+                p1 = 1 / (1 + math.exp(-(f1["skill"] - f2["skill"])))
+                winner, loser = (f1, f2) if rng.random() < p1 else (f2, f1)
+                r = rng.random()
+                method = "DEC" if r < METHODS["DEC"][0] else "KO" if r < METHODS["DEC"][0] + METHODS["KO"][0] else "SUB"
+            if method in ("DEC", "DRAW"):
+                rnd, clock = rounds, "5:00"
+                detail = rng.choice(METHODS["DEC"][1])
+            else:
+                rnd = min(rounds, 1 + int(rng.expovariate(1.0)))
+                clock = f"{rng.randint(0, 4)}:{rng.randint(0, 59):02d}"
+                detail = rng.choice(METHODS[method][1])
+            if title and method != "DRAW":
+                champions[d] = winner
+
+            bouts.append((d, winner["name"], loser["name"], "Draw" if method == "DRAW" else winner["name"],
+                          detail, rnd, clock, f"http://ufcstats.com/fight-details/{rng.getrandbits(64):016x}",
+                          "DEC" if method == "DRAW" else method, title, b == 0))
+
+            for fighter in (f1, f2):
+                fighter["skill"] += rng.gauss(0, 0.1)
+                fighter["left"] -= 1
+                if fighter["left"] <= 0:
+                    rosters[d].retire(fighter)
+                    fighter["slot"] = None
+                    rosters[d].add(new_fighter())
+        made += len(bouts)
+        main = bouts[0]
+        event_name = f"SFC {e + 1}: {main[1].split(' ', 1)[1]} vs. {main[2].split(' ', 1)[1]}"
+        events.append((event_name, day.strftime(FIGHT_DATE_FORMAT), f"http://ufcstats.com/event-details/{rng.getrandbits(64):016x}", bouts))
+
+    rows = []
+    # the scraper writes the newest card first, main event first
+    for event_name, day, event_url, bouts in reversed(events):
+        for d, f1, f2, winner, detail, rnd, clock, fight_url, method, is_title, is_main in bouts:
+            rows.append((event_name, day, d, f1, f2, winner, detail, rnd, clock, event_url, fight_url, method, is_title, is_main))
+    return pd.DataFrame(rows, columns=["Event", "Date", "Weight Class", "Fighter 1", "Fighter 2", "Winner", "Method",
+                                       "Round", "Time", "Event URL", "Fight URL", "method", "Is_Title_Fight", "Is_Main_Event"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic fights_enhanced.csv-shaped fight history")
+    parser.add_argument("size", help="number of fights, like 10k, 100k or 1M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="output CSV (default: synthetic_fights_<size>.csv)")
+    args = parser.parse_args()
+    df = generate_fights(parse_size(args.size), args.seed)
+    out = args.out or f"synthetic_fights_{args.size}.csv"
+    df.to_csv(out, index=False)
+    print(f"Saved {len(df)} fights by {len(set(df['Fighter 1']) | set(df['Fighter 2']))} fighters to {out}")
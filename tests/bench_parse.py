@@ -0,0 +1,71 @@
+"""
+Checks the event page parsers against the original one and times them.
+
+Runs over saved event pages: by default the ones committed in
+tests/fixtures/event_pages, or another directory of saved pages, or with
+--cache every event-details page in the HTTP cache. Every parser must give
+the rows the original gives on every page.
+
+python tests/bench_parse.py                # tests/fixtures/event_pages
+python tests/bench_parse.py --cache        # the cached event pages
+"""
+import argparse, glob, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import baseline
+from fetch import HttpCache
+from scrape_ufc_fights_enhanced import PARSERS
+
+FIXTURE_PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "event_pages")
+
+
+def cached_pages(cache):
+    rows = cache._db.execute("SELECT url FROM entries WHERE url LIKE '%event-details%' ORDER BY url").fetchall()
+    for (url,) in rows:
+        res = cache.read(url, cache.lookup(url))
+        if res is not None:
+            yield url, res.text
+
+
+def saved_pages(directory):
+    for path in sorted(p for p in glob.glob(os.path.join(directory, "**", "*"), recursive=True) if os.path.isfile(p)):
+        with open(path, "r", encoding="utf-8") as f:
+            yield path, f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare and benchmark the event page parsers")
+    parser.add_argument("corpus", nargs="?", default=FIXTURE_PAGES, help="directory of saved event pages (default: tests/fixtures/event_pages)")
+    parser.add_argument("--cache", action="store_true", help="run over the event pages in the HTTP cache instead")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the corpus per parser")
+    args = parser.parse_args()
+
+    pages = list(cached_pages(HttpCache()) if args.cache else saved_pages(args.corpus))
+    if not pages:
+        parser.error("no event pages found")
+
+    mismatches = 0
+    for name, html in pages:
+        expected = baseline.parse_event_fights(html, "event", "date", name)
+        for p, fn in PARSERS.items():
+            if fn(html, "event", "date", name) != expected:
+                mismatches += 1
+                print(f"MISMATCH {p} {name}")
+    print(f"{len(pages)} pages, {sum(len(baseline.parse_event_fights(h, '', '', n)) for n, h in pages)} fights, {mismatches} mismatches")
+
+    for p, fn in {"original": baseline.parse_event_fights, **PARSERS}.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            for name, html in pages:
+                fn(html, "event", "date", name)
+            best = min(best, time.perf_counter() - t)
+        print(f"{p:8s} {best:.3f}s  {best / len(pages) * 1000:.2f} ms/page")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Times the array replay kernel against the original iterrows loop and checks they give the same Elo.
+
+python tests/bench_replay.py               # data/fights_enhanced.csv
+python tests/bench_replay.py --size 100k   # a synthetic history
+"""
+import argparse, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import baseline
+from elo_engine import ELO_COLS, FIGHTS_PATH, fight_columns, load_fights, new_state, replay
+from storage import typed_fights
+from synthetic_fights import generate_fights, parse_size
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the replay kernel against the iterrows loop")
+    parser.add_argument("--size", help="replay a synthetic history of this many fights (10k, 100k) instead of the real one")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per implementation, the best one counts")
+    args = parser.parse_args()
+
+    if args.size:
+        f = typed_fights(generate_fights(parse_size(args.size)))
+        f = f.iloc[::-1].sort_values("Date", kind="stable").reset_index(drop=True)
+    else:
+        f = load_fights(FIGHTS_PATH)
+
+    def kernel():
+        state = new_state()
+        return replay(state, fight_columns(f, state))
+
+    def iterrows():
+        g = f.copy()
+        baseline.replay(g)
+        return g[ELO_COLS].to_numpy()
+
+    new_time, new_elo = best_of(args.repeat, kernel)
+    old_time, old_elo = best_of(args.repeat, iterrows)
+    same = np.array_equal(new_elo, old_elo)
+    print(f"{len(f)} fights")
+    print(f"iterrows {old_time:8.3f}s")
+    print(f"kernel   {new_time:8.3f}s  {old_time / new_time:.1f}x faster")
+    print("Elo identical" if same else "Elo DIFFERS")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os, sys
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), os.path.join(ROOT, "web")]
+
+TODAY = date(2024, 12, 31)
+
+
+def days_ago(n):
+    return TODAY - timedelta(days=n)
+
+
+def edge_case_fights():
+    """A small history in the fights_enhanced.csv layout that goes through the replay and leaderboard rules:
+    vacant titles, defenses with the champion listed on either side, a champion stripped by a title fight
+    between others, a two-division champion, TUF false positives, draws, a no contest, early finishes,
+    a 30 fight career, every loss count tier and every inactivity decay tier. Rows are newest first, like
+    the scraper writes them"""
+    rows = []
+
+    def fight(day, weight_class, f1, f2, winner, method="U-DEC", round_=3, title=False, main=False):
+        simplified = "KO" if "KO" in method else "SUB" if "SUB" in method else "DEC"
+        rows.append({
+            "Event": f"Fixture {day:%Y-%m-%d}", "Date": day.strftime("%B %d, %Y"), "Weight Class": weight_class,
+            "Fighter 1": f1, "Fighter 2": f2, "Winner": winner, "Method": method, "Round": round_,
+            "Time": "5:00" if simplified == "DEC" else "2:13",
+            "Event URL": f"http://ufcstats.com/event-details/{day:%Y%m%d}",
+            "Fight URL": f"http://ufcstats.com/fight-details/{len(rows):04d}",
+            "method": simplified, "Is_Title_Fight": title, "Is_Main_Event": main or title,
+        })
+
+    # 30 fight journeyman, a loss every third fight, with every kind of finish
+    methods = [("KO/TKOPunches", 1), ("SUBRear Naked Choke", 2), ("U-DEC", 3)]
+    for i in range(30):
+        method, round_ = methods[i % 3]
+        winner = f"Prospect {i}" if i % 3 == 2 else "Gatekeeper"
+        fight(date(2012, 1, 1) + timedelta(days=60 * i), "Lightweight", "Gatekeeper", f"Prospect {i}", winner, method, round_)
+
+    # welterweight: a vacant title, an undefeated champion who takes it and defends it 5 times, then is stripped
+    fight(date(2010, 3, 1), "Welterweight", "Zero Champ", "WW Opp 0", "Zero Champ", title=True)
+    for i in range(1, 5):
+        fight(date(2010, 3, 1) + timedelta(days=90 * i), "Welterweight", "Great", f"WW Opp {i}", "Great", main=True)
+    fight(date(2011, 6, 1), "Welterweight", "Zero Champ", "Great", "Great", "KO/TKOKnee", 1, title=True)
+    for i in range(5):
+        day = date(2012, 1, 1) + timedelta(days=300 * i)
+        if i == 2:
+            fight(day, "Welterweight", f"Challenger {i}", "Great", "Great", "S-DEC", 5, title=True)
+        else:
+            fight(day, "Welterweight", "Great", f"Challenger {i}", "Great", "SUBArmbar", 4, title=True)
+    fight(days_ago(1300), "Welterweight", "Great", "WW Opp 5", "Great")
+    for i in range(4):
+        fight(days_ago(1100 - 100 * i), "Welterweight", f"WW Opp {6 + i}", "Zero Champ", f"WW Opp {6 + i}")
+    fight(days_ago(600), "Welterweight", "WW New", "WW Other", "WW New", title=True)
+
+    # lightweight: a champion who wins 11 without a loss, with a TUF title fight in between that mustn't count
+    fight(date(2016, 1, 1), "Lightweight", "LW Zero", "LW Opp 0", "LW Zero", title=True)
+    for i in range(1, 4):
+        fight(date(2016, 1, 1) + timedelta(days=60 * i), "Lightweight", "Champ A", f"LW Opp {i}", "Champ A", "KO/TKOPunch", 2)
+    fight(date(2017, 1, 1), "Lightweight", "Champ A", "LW Zero", "Champ A", title=True)
+    for i in range(7):
+        day = date(2017, 6, 1) + timedelta(days=250 * i)
+        if i == 3:
+            fight(day, "Lightweight", "Tony Ferguson", "Ramsey Nijem", "Tony Ferguson", title=True)
+            fight(day, "Lightweight", f"LW Contender {i}", "Champ A", "Champ A", title=True)
+        else:
+            fight(day, "Lightweight", "Champ A", f"LW Contender {i}", "Champ A", "KO/TKOElbows", 1, title=True)
+    fight(days_ago(200), "Lightweight", "Champ A", "LW Contender 7", "Champ A", title=True)
+    fight(date(2019, 3, 1), "Featherweight", "Diego Brandao", "FW Opp 1", "Diego Brandao", title=True)
+
+    # a champion in two divisions, with three losses
+    fight(date(2017, 1, 1), "Featherweight", "FW Champ", "FW Opp 0", "FW Champ", title=True)
+    fight(date(2018, 1, 1), "Bantamweight", "Double Champ", "BW Opp", "Double Champ", title=True)
+    fight(date(2019, 6, 1), "Featherweight", "Double Champ", "FW Champ", "Double Champ", "KO/TKOPunches", 3, title=True)
+    for i in range(3):
+        fight(date(2020, 1, 1) + timedelta(days=200 * i), "Featherweight", f"Spoiler {i}", "Double Champ", f"Spoiler {i}")
+    fight(days_ago(90), "Featherweight", "Double Champ", "Spoiler 3", "Double Champ")
+
+    # 3, 5 and 7 losses, last seen at different ages
+    for name, wins, losses, last in [("Three Losses", 2, 3, 400), ("Five Losses", 1, 5, 650), ("Seven Losses", 2, 7, 1000)]:
+        for i in range(wins + losses):
+            day = days_ago(last + 40 * (wins + losses - 1 - i))
+            opponent = f"{name} Opp {i}"
+            fight(day, "Middleweight", name, opponent, name if i < wins else opponent)
+
+    # women's flyweight: an unbeaten champion and a journeywoman with 5 losses
+    fight(date(2019, 1, 1), "Women's Flyweight", "W Champ", "W Opp 0", "W Champ", title=True)
+    for i in range(1, 9):
+        fight(date(2019, 1, 1) + timedelta(days=200 * i), "Women's Flyweight", "W Champ", f"W Opp {i}", "W Champ", title=i % 2 == 0)
+    fight(TODAY, "Women's Flyweight", "W Champ", "W Opp 9", "W Champ", title=True)
+    for i in range(7):
+        opponent = f"W Journey Opp {i}"
+        fight(days_ago(60 + 30 * (6 - i)), "Women's Flyweight", "W Journey", opponent, "W Journey" if i < 2 else opponent)
+
+    # draws (scraped and lowercase) and a no contest, all on one card
+    fight(days_ago(100), "Heavyweight", "Draw A", "Draw B", "Draw", main=True)
+    fight(days_ago(100), "Heavyweight", "Draw A", "Draw C", "draw")
+    fight(days_ago(100), "Heavyweight", "Draw B", "Draw C", "NC")
+
+    df = pd.DataFrame(rows)
+    df["_day"] = pd.to_datetime(df["Date"], format="%B %d, %Y")
+    # newest card first, bouts of a card in reverse, so load_fights() replays them in the order written here
+    return df.iloc[::-1].sort_values("_day", ascending=False, kind="stable").drop(columns="_day").reset_index(drop=True)
+
+
+@pytest.fixture
+def fights_csv(tmp_path):
+    path = tmp_path / "fights_enhanced.csv"
+    edge_case_fights().to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def export_dir(tmp_path_factory):
+    """The tracker's outputs for the edge case fights, published like tracker2.0.py does"""
+    from elo_engine import EloEngine
+    out_dir = tmp_path_factory.mktemp("data")
+    edge_case_fights().to_csv(out_dir / "fights_enhanced.csv", index=False)
+    engine = EloEngine()
+    engine._manual_champs = {"Champ A": "Champion", "WW New": "Champion", "W Champ": "Transition Champion"}
+    engine.load_fights(str(out_dir / "fights_enhanced.csv"))
+    engine.replay()
+    engine.export(str(out_dir / "elo_checkpoint.json"), str(out_dir))
+    return str(out_dir)
@@ -0,0 +1,243 @@
+import gzip, json
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+import brotli
+import pytest
+import app as web_app
+from elo_kernel import expected
+from store import BundleStore, MIN_COMPRESS_BYTES
+
+
+@pytest.fixture
+def client(export_dir, monkeypatch):
+    monkeypatch.setattr(web_app, "bundles", BundleStore(export_dir))
+    return web_app.app.test_client()
+
+
+def get(client, url, **headers):
+    return client.get(url, headers=headers)
+
+
+@pytest.mark.parametrize("accept, encoding", [
+    ("br", "br"),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0.1", "gzip"),
+    ("identity", None),
+    ("deflate", None),
+    (None, None),
+])
+def test_send_negotiates_the_encoding(client, accept, encoding):
+    plain = get(client, "/api/current")
+    res = get(client, "/api/current", **({"Accept-Encoding": accept} if accept else {}))
+    assert len(plain.data) >= MIN_COMPRESS_BYTES
+    assert res.status_code == 200
+    assert res.headers.get("Content-Encoding") == encoding
+    assert res.headers["Vary"] == "Accept-Encoding"
+    decode = {"br": brotli.decompress, "gzip": gzip.decompress, None: bytes}[encoding]
+    assert decode(res.data) == plain.data
+    # one ETag per representation
+    etag = plain.headers["ETag"].strip('"')
+    assert res.headers["ETag"] == (f'"{etag}"' if encoding is None else f'"{etag}-{encoding}"')
+
+
+def test_send_leaves_small_bodies_alone(client):
+    res = get(client, "/api/trends/nobody", **{"Accept-Encoding": "br, gzip"})
+    assert json.loads(res.data) == []
+    assert "Content-Encoding" not in res.headers
+    assert res.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("accept", [None, "br", "gzip"])
+def test_send_answers_304_for_any_representation(client, accept):
+    headers = {"Accept-Encoding": accept} if accept else {}
+    first = get(client, "/api/current", **headers)
+    for tag in (first.headers["ETag"], '"%s-br"' % first.headers["ETag"].strip('"').split("-")[0],
+                "W/" + first.headers["ETag"], f'"stale", {first.headers["ETag"]}', "*"):
+        res = get(client, "/api/current", **headers, **{"If-None-Match": tag})
+        assert res.status_code == 304
+        assert res.data == b""
+        assert res.headers["ETag"] == first.headers["ETag"]
+        assert res.headers["Vary"] == "Accept-Encoding"
+        assert "Content-Encoding" not in res.headers
+    assert get(client, "/api/current", **headers, **{"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_etag_follows_the_content(client):
+    current, peak = get(client, "/api/current"), get(client, "/api/peak")
+    assert current.headers["ETag"] != peak.headers["ETag"]
+    assert get(client, "/api/peak", **{"If-None-Match": current.headers["ETag"]}).status_code == 200
+    assert get(client, "/api/current").headers["ETag"] == current.headers["ETag"]
+
+
+def test_matchup_matrix_echoes_the_division_name(client):
+    first = client.post("/api/predict", json={"weight_class": "LIGHTWEIGHT"})
+    second = client.post("/api/predict", json={"weight_class": "lightweight"})
+    assert first.status_code == second.status_code == 200
+    assert json.loads(first.data)["weight_class"] == json.loads(second.data)["weight_class"] == "Lightweight"
+    assert first.headers["ETag"] == second.headers["ETag"]
+    unknown = json.loads(client.post("/api/predict", json={"weight_class": "Catch Weight"}).data)
+    assert unknown == {"weight_class": "Catch Weight", "fighters": [], "matrix": []}
+
+
+def walk(client, url):
+    """Every page of a cursor walk, following the Link header, and the responses"""
+    pages, responses = [], []
+    while url:
+        res = client.get(url)
+        assert res.status_code == 200, res.data
+        pages.append(json.loads(res.data))
+        responses.append(res)
+        link = res.headers.get("Link")
+        if link:
+            assert link.startswith("<") and link.endswith('>; rel="next"')
+            url = link[1:link.index(">")]
+            args = parse_qs(urlsplit(url).query)
+            assert args["cursor"] == [res.headers["X-Next-Cursor"]] and "offset" not in args
+        else:
+            assert "X-Next-Cursor" not in res.headers
+            url = None
+    return pages, responses
+
+
+# ties in Weight Class and Record, missing values in Status
+@pytest.mark.parametrize("board, sort", [(board, sort) for board in ("current", "peak")
+                                         for sort in (None, "Fighter", "-Fighter", "Weight Class", "Record")]
+                         + [("current", "Status"), ("current", "-Status"), ("current", "Last_Fight")])
+def test_cursor_walk_covers_the_board_once(client, board, sort):
+    everyone = json.loads(get(client, f"/api/{board}").data)
+    query = f"/api/{board}?limit=7" + (f"&sort={sort}" if sort else "")
+    pages, responses = walk(client, query)
+    names = [r["Fighter"] for page in pages for r in page]
+    assert len(names) == len(set(names)) == len(everyone)
+    assert set(names) == {r["Fighter"] for r in everyone}
+    assert all(len(page) == 7 for page in pages[:-1]) and 0 < len(pages[-1]) <= 7
+    assert {res.headers["X-Total-Count"] for res in responses} == {str(len(everyone))}
+    # the same order as the whole board in one response
+    whole = json.loads(get(client, query.replace("limit=7", "limit=0")).data)
+    assert names == [r["Fighter"] for r in whole]
+
+
+def test_cursor_walk_with_filters_and_offset(client):
+    everyone = json.loads(get(client, "/api/current").data)
+    division = Counter(r["Weight Class"] for r in everyone).most_common(1)[0][0]
+    members = [r["Fighter"] for r in everyone if r["Weight Class"] == division]
+    assert len(members) > 5
+    pages, responses = walk(client, f"/api/current?weight_class={division.lower()}&limit=2&offset=1")
+    assert [r["Fighter"] for page in pages for r in page] == members[1:]
+    assert responses[0].headers["X-Total-Count"] == str(len(members))
+    # the Link keeps the other arguments
+    args = parse_qs(urlsplit(responses[0].headers["Link"][1:].split(">")[0]).query)
+    assert args["weight_class"] == [division.lower()] and args["limit"] == ["2"]
+    # search and weight_class together
+    found = [r["Fighter"] for r in everyone if r["Weight Class"] == division and "opp" in r["Fighter"].lower()]
+    assert 1 < len(found) < len(members)
+    pages, _ = walk(client, f"/api/current?weight_class={division}&search=opp&limit=1")
+    assert [r["Fighter"] for page in pages for r in page] == found
+
+
+def test_offset_pages(client):
+    everyone = json.loads(get(client, "/api/current").data)
+    res = get(client, "/api/current?limit=5&offset=5")
+    assert json.loads(res.data) == everyone[5:10]
+    assert res.headers["X-Total-Count"] == str(len(everyone))
+    # past the end, an empty page and nowhere to go next
+    res = get(client, f"/api/current?limit=5&offset={len(everyone)}")
+    assert json.loads(res.data) == [] and "Link" not in res.headers and "X-Next-Cursor" not in res.headers
+
+
+def test_fields_projection(client):
+    everyone = json.loads(get(client, "/api/current").data)
+    res = get(client, "/api/current?fields=Fighter,Elo&limit=3")
+    assert json.loads(res.data) == [{"Fighter": r["Fighter"], "Elo": r["Elo"]} for r in everyone[:3]]
+    # on its own, fields still returns the whole board
+    rows = json.loads(get(client, "/api/peak?fields=Fighter").data)
+    assert len(rows) == len(json.loads(get(client, "/api/peak").data)) and all(list(r) == ["Fighter"] for r in rows)
+    pages, _ = walk(client, "/api/current?fields=Record&limit=10&sort=Fighter")
+    assert all(list(r) == ["Record"] for page in pages for r in page)
+
+
+def test_cursor_survives_a_different_page_size(client):
+    first = get(client, "/api/current?limit=4&sort=Fighter")
+    rest = json.loads(get(client, f"/api/current?limit=100&sort=Fighter&cursor={first.headers['X-Next-Cursor']}").data)
+    whole = json.loads(get(client, "/api/current?sort=Fighter").data)
+    assert json.loads(first.data) + rest == whole
+
+
+@pytest.mark.parametrize("query", [
+    "cursor=!!!",
+    "cursor=bm90IGpzb24",  # base64, not JSON
+    "cursor=" + web_app.encode_cursor("Fighter", "Not A Fighter"),
+    "cursor=" + web_app.encode_cursor("-Elo", "Champ A") + "&sort=Fighter",  # made for another sort
+    "sort=Nope",
+    "sort=-",
+    "fields=Fighter,Nope",
+    "offset=-1",
+])
+def test_bad_queries_are_400(client, query):
+    res = get(client, f"/api/current?{query}")
+    assert res.status_code == 400
+    assert get(client, f"/api/peak?{query}").status_code == 400
+
+
+def test_predict_matches_expected(client):
+    everyone = json.loads(get(client, "/api/current").data)
+    elo = {r["Fighter"]: r["Elo"] for r in everyone}
+    a, b, c = everyone[0]["Fighter"], everyone[len(everyone) // 2]["Fighter"], everyone[-1]["Fighter"]
+    pairs = [[a, b], [c, a], [b.upper(), c.lower()], [a, a]]
+    res = client.post("/api/predict", json={"pairs": pairs})
+    assert res.status_code == 200
+    got = json.loads(res.data)
+    assert [[r["fighter1"], r["fighter2"]] for r in got] == pairs
+    for r, (f1, f2) in zip(got, [(a, b), (c, a), (b, c), (a, a)]):
+        assert r["fighter1_win"] == pytest.approx(expected(elo[f1], elo[f2]), rel=1e-12)
+        assert r["fighter1_win"] + r["fighter2_win"] == pytest.approx(1)
+    assert got[0]["fighter1_win"] > 0.5 > got[1]["fighter1_win"] and got[3]["fighter1_win"] == pytest.approx(0.5)
+    assert json.loads(client.post("/api/predict", json={"pairs": []}).data) == []
+
+
+def test_predict_matrix_matches_expected(client):
+    everyone = json.loads(get(client, "/api/current").data)
+    elo = {r["Fighter"]: r["Elo"] for r in everyone}
+    got = json.loads(client.post("/api/predict", json={"weight_class": "Lightweight"}).data)
+    assert got["fighters"] == [r["Fighter"] for r in everyone if r["Weight Class"] == "Lightweight"]
+    for i, f1 in enumerate(got["fighters"]):
+        for j, f2 in enumerate(got["fighters"]):
+            assert got["matrix"][i][j] == pytest.approx(expected(elo[f1], elo[f2]), rel=1e-12)
+
+
+@pytest.mark.parametrize("body", [
+    {"pairs": [["Champ A", "Nobody"]]},
+    {"pairs": [["Nobody", "Champ A"], ["Champ A", "Champ A"]]},
+    {"pairs": [["Gatekeeper", "Champ A"]]},  # retired, not on the current board
+    {"pairs": [["Champ A"]]},
+    {"pairs": [["Champ A", 1]]},
+    {"pairs": "Champ A vs Nobody"},
+    {"pairs": [("Champ A", "Champ A", "Champ A")]},
+    {"weight_class": 1},
+    {},
+    [["Champ A", "Champ A"]],
+    "Champ A",
+    None,
+])
+def test_predict_rejects_bad_bodies(client, body):
+    res = client.post("/api/predict", data=json.dumps(body), content_type="application/json")
+    assert res.status_code == 400
+
+
+def test_predict_rejects_malformed_json(client):
+    assert client.post("/api/predict", data="{pairs:", content_type="application/json").status_code == 400
+    assert client.post("/api/predict", data="").status_code == 400
+    unknown = client.post("/api/predict", json={"pairs": [["Champ A", "Nobody"], ["Nobodier", "Nobody"]]})
+    assert b"Nobodier, Nobody" in unknown.data
+
+
+def test_trends_from_the_line_per_fighter_file(client, export_dir):
+    with open(f"{export_dir}/fight_trends_2.0.json") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "{" and lines[-1] == "}"
+    gatekeeper = json.loads(get(client, "/api/trends/GATEKEEPER").data)
+    assert len(gatekeeper) == 30 and gatekeeper[0]["Opponent"] == "Prospect 0"
+    assert gatekeeper[-1]["EloAfter"] == pytest.approx(gatekeeper[-1]["EloBefore"] + gatekeeper[-1]["EloChange"], abs=0.1)
+    assert sum(1 for line in lines if line.startswith('"gatekeeper": ')) == 1
@@ -0,0 +1,148 @@
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+import requests
+from fetch import IMMUTABLE, REVALIDATE, CacheMiss, Fetcher, HttpCache, RateLimiter, make_session
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """A few ufcstats-like pages: /page has an ETag, /dated a Last-Modified, /flaky fails with
+    the statuses queued in server.failures first"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.log.append((self.path, dict(self.headers), time.monotonic()))
+            failure = server.failures.pop(0) if self.path == "/flaky" and server.failures else None
+        if failure:
+            self.reply(failure, b"busy")
+        elif self.path == "/page" and self.headers.get("If-None-Match") == '"v1"':
+            self.reply(304, b"")
+        elif self.path == "/dated" and self.headers.get("If-Modified-Since") == "Sat, 13 Apr 2024 00:00:00 GMT":
+            self.reply(304, b"")
+        elif self.path == "/page":
+            self.reply(200, b"<html>page</html>", {"ETag": '"v1"'})
+        elif self.path == "/dated":
+            self.reply(200, b"<html>dated</html>", {"Last-Modified": "Sat, 13 Apr 2024 00:00:00 GMT"})
+        else:
+            self.reply(200, f"<html>{self.path}</html>".encode())
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    httpd.lock, httpd.log, httpd.failures = threading.Lock(), [], []
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_rate_limit_is_per_host_and_shared_by_threads():
+    limiter = RateLimiter(20)
+    times = {"a": [], "b": []}
+
+    def call(host):
+        limiter.wait(f"http://{host}/x")
+        times[host].append(time.monotonic())
+
+    threads = [threading.Thread(target=call, args=(host,)) for host in ["a"] * 6 + ["b"] * 2]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gaps = [b - a for a, b in zip(sorted(times["a"]), sorted(times["a"])[1:])]
+    assert min(gaps) > 0.04
+    # the other host has its own slots, its first request doesn't queue behind host a
+    assert min(times["b"]) - start < 0.04
+
+
+def test_fetcher_spaces_concurrent_requests(server):
+    fetcher = Fetcher(workers=4, rate=20, cache=False)
+    threads = [threading.Thread(target=fetcher.get, args=(f"{server.url}/event/{i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    arrivals = sorted(t for _, _, t in server.log)
+    assert len(arrivals) == 6
+    assert arrivals[-1] - arrivals[0] > 5 * 0.05 * 0.8
+
+
+@pytest.mark.parametrize("statuses", [[429, 503, 503], [503]])
+def test_retries_with_backoff(server, statuses):
+    server.failures = list(statuses)
+    session = make_session(retries=3, backoff=0.05)
+    res = session.get(f"{server.url}/flaky", timeout=5)
+    assert res.status_code == 200
+    arrivals = [t for path, _, t in server.log]
+    assert len(arrivals) == len(statuses) + 1
+    # urllib3 retries the first failure at once, then waits backoff * 2 ** (n - 1)
+    for n, gap in enumerate(b - a for a, b in zip(arrivals, arrivals[1:])):
+        assert gap >= (0.05 * 2 ** n if n else 0) * 0.9
+
+
+def test_gives_up_after_the_retries(server):
+    server.failures = [503] * 3
+    with pytest.raises(requests.exceptions.RetryError):
+        make_session(retries=2, backoff=0).get(f"{server.url}/flaky", timeout=5)
+
+
+@pytest.mark.parametrize("path, header, value", [("/page", "If-None-Match", '"v1"'),
+                                                 ("/dated", "If-Modified-Since", "Sat, 13 Apr 2024 00:00:00 GMT")])
+def test_revalidation_serves_304_from_the_cache(server, tmp_path, path, header, value):
+    fetcher = Fetcher(cache_dir=str(tmp_path))
+    first = fetcher.get(server.url + path, REVALIDATE)
+    second = fetcher.get(server.url + path, REVALIDATE)
+    assert not first.from_cache and second.from_cache
+    assert second.text == first.text
+    assert header not in server.log[0][1] and server.log[1][1][header] == value
+    # IMMUTABLE never goes back to the server
+    assert fetcher.get(server.url + path, IMMUTABLE).text == first.text
+    assert len(server.log) == 2
+
+
+def test_offline_serves_the_cache_and_raises_on_a_miss(server, tmp_path):
+    Fetcher(cache_dir=str(tmp_path)).get(f"{server.url}/page")
+    offline = Fetcher(offline=True, cache_dir=str(tmp_path))
+    assert offline.get(f"{server.url}/page").text == "<html>page</html>"
+    with pytest.raises(CacheMiss):
+        offline.get(f"{server.url}/never-fetched")
+    assert len(server.log) == 1
+
+
+def test_evict_drops_the_least_recently_used(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=25)
+
+    def store(url, body):
+        cache.store(url, SimpleNamespace(content=body, encoding="utf-8", apparent_encoding="utf-8", headers={}))
+        time.sleep(0.01)
+
+    store("a", b"a" * 10)
+    store("b", b"b" * 10)
+    cache.read("a", cache.lookup("a"))
+    time.sleep(0.01)
+    store("c", b"c" * 10)
+    assert cache.lookup("b") is None
+    assert cache.read("a", cache.lookup("a")).content == b"a" * 10
+    assert cache.read("c", cache.lookup("c")).content == b"c" * 10
+    # the body of an evicted entry goes too
+    assert sum(1 for p in (tmp_path / "objects").rglob("*") if p.is_file()) == 2
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+import baseline
+from elo_engine import EloEngine, build_leaderboards, load_fights
+from elo_kernel import apply_decay, get_championship_boost
+
+MANUAL_CHAMPS = {"Champ A": "Champion", "WW New": "Champion", "W Champ": "Transition Champion",
+                 "Zero Champ": "Former Champion", "Not In The Data": "Champion"}
+# around every edge of the grace periods and decay tiers
+DAYS = [0, 60, 120, 121, 300, 365, 366, 549, 550, 551, 700, 730, 731, 900, 1095, 1096, 1500, 1825, 1826, 4000]
+
+
+@pytest.mark.parametrize("is_champion", [False, True])
+def test_apply_decay_matches_per_row(is_champion):
+    ref = pd.Timestamp("2024-12-31")
+    last = pd.Series([ref - pd.Timedelta(days=d) for d in DAYS] + [pd.NaT])
+    elo = np.linspace(900, 1600, len(last))
+    expected = [baseline.apply_decay(e, l, ref, is_champion) for e, l in zip(elo, last)]
+    np.testing.assert_allclose(apply_decay(elo, last, ref, np.full(len(last), is_champion)), expected, rtol=1e-12)
+
+
+def test_championship_boost_matches_per_row():
+    grid = [(c, d, former) for c in (False, True) for d in range(9) for former in (False, True)]
+    champion, defenses, former = (np.array(x) for x in zip(*grid))
+    expected = [baseline.get_championship_boost(*row) for row in grid]
+    np.testing.assert_allclose(get_championship_boost(champion, defenses, former), expected, rtol=1e-12)
+
+
+@pytest.fixture
+def boards(fights_csv):
+    engine = EloEngine()
+    engine._manual_champs = MANUAL_CHAMPS
+    engine.load_fights(fights_csv)
+    engine.replay()
+    f = load_fights(fights_csv)
+    state = baseline.replay(f)
+    return build_leaderboards(engine.fights, engine.state, MANUAL_CHAMPS), baseline.leaderboards(f, state, MANUAL_CHAMPS), f, state
+
+
+def test_leaderboards_match_per_row(boards):
+    (final, active, peak), (ref_final, ref_active, ref_peak), _, _ = boards
+    columns = ["Fighter", "Elo", "Last_Fight", "Weight Class", "Is_Champion", "Title_Defenses", "Is_Former_Champion", "Status", "Record"]
+    for got, want in [(final, ref_final), (active, ref_active)]:
+        pd.testing.assert_frame_equal(got[columns].reset_index(drop=True), want[columns].reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False, rtol=1e-12)
+    columns = ["Fighter", "Peak Elo", "Weight Class", "Record"]
+    pd.testing.assert_frame_equal(peak[columns], ref_peak[columns], check_dtype=False, check_categorical=False, rtol=1e-12)
+
+
+def test_edge_cases_reach_every_rule(boards):
+    _, (final, _, peak), f, state = boards
+    days = (f["Date"].max() - final.set_index("Fighter")["Last_Fight"]).dt.days
+    champion = final.set_index("Fighter")["Is_Champion"]
+    # every decay tier for the rest, both sides of the grace year for champions
+    tiers = pd.cut(days[~champion], [-1, 120, 550, 730, 1095, 1825, np.inf])
+    assert tiers.value_counts().min() > 0
+    assert (days[champion] <= 365).any() and (days[champion] > 365).any()
+
+    losses = pd.Series({name: r["L"] for name, r in state["records"].items()})
+    assert pd.cut(losses, [-1, 2, 4, 6, 8, np.inf]).value_counts().min() > 0
+    records = state["records"]
+    assert records["Champ A"]["L"] == 0 and records["Champ A"]["W"] >= 8 and champion["Champ A"]
+    assert records["Great"]["L"] == 0 and records["Great"]["W"] >= 10 and "Great" in state["former_champions"]
+    assert final.set_index("Fighter").loc["Great", "Status"] == "Former Champion"
+    assert records["Double Champ"]["L"] >= 3
+    assert (peak["Weight Class"] == "Women's Flyweight").any()
@@ -0,0 +1,36 @@
+import glob, os
+import pytest
+import baseline
+from scrape_ufc_fights_enhanced import PARSERS
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "event_pages")
+PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, "*.html")))
+EVENT = ("UFC Fixture", "April 13, 2024", "http://ufcstats.com/event-details/0123456789abcdef")
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("parser", sorted(PARSERS))
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_parser_matches_original(path, parser):
+    html = read(path)
+    expected = baseline.parse_event_fights(html, *EVENT)
+    assert expected
+    assert PARSERS[parser](html, *EVENT) == expected
+
+
+def test_pages_reach_every_rule():
+    rows = [row for path in PAGES for row in baseline.parse_event_fights(read(path), *EVENT)]
+    fights = {row[3] + " vs " + row[4]: row for row in rows}
+    # winner listed second on the page comes out as Fighter 1
+    assert fights["Max Holloway vs Justin Gaethje"][5] == "Max Holloway"
+    assert fights["Zhang Weili vs Yaçkuna Jandiroba"][12]
+    assert fights["Mackenzie Dern vs Amanda Ribas"][5] == "Draw"
+    assert fights["Jiri Prochazka vs Aleksandar Rakic"][5] == "Draw"
+    assert fights["Sean O'Malley vs Marlon \"Chito\" Vera"][11] == "SUB"
+    assert {row[11] for row in rows} == {"KO", "SUB", "DEC"}
+    # the cut short row and the one with a single fighter link are skipped
+    assert not any("Cancelled" in name or "Mariscal" in name for name in fights)
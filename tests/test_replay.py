@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import baseline
+from elo_engine import ELO_COLS, EloEngine, load_fights
+from synthetic_fights import generate_fights
+
+
+@pytest.fixture(params=["edge_cases", "synthetic"])
+def fights_path(request, fights_csv, tmp_path):
+    if request.param == "edge_cases":
+        return fights_csv
+    path = tmp_path / "synthetic.csv"
+    generate_fights(3000, seed=1).to_csv(path, index=False)
+    return str(path)
+
+
+def replayed(path):
+    engine = EloEngine()
+    engine._manual_champs = {}
+    engine.load_fights(path)
+    return engine.replay()
+
+
+def test_replay_matches_iterrows_reference(fights_path):
+    engine = replayed(fights_path)
+    f = load_fights(fights_path)
+    ref = baseline.replay(f)
+
+    np.testing.assert_array_equal(engine.fights[ELO_COLS].to_numpy(), f[ELO_COLS].to_numpy())
+    state = engine.state
+    names = state["names"]
+    assert names == list(ref["elo"])
+    assert state["elo"] == [ref["elo"][n] for n in names]
+    assert state["peak"] == [ref["peak"][n] for n in names]
+    assert state["fcount"] == [ref["fcount"][n] for n in names]
+    assert list(zip(state["wins"], state["losses"], state["draws"])) == [tuple(ref["records"][n].values()) for n in names]
+    assert state["title_defenses"] == [ref["title_defenses"].get(n, 0) for n in names]
+    assert {n for n, former in zip(names, state["former_champions"]) if former} == ref["former_champions"]
+    assert {wc: names[i] for wc, i in state["current_champions"].items()} == ref["current_champions"]
+
+
+def test_edge_cases_reach_the_title_rules(fights_csv):
+    ref = baseline.replay(load_fights(fights_csv))
+    # the TUF title fight doesn't take the belt, a defense listed as Fighter 2 still counts
+    assert ref["current_champions"]["Lightweight"] == "Champ A"
+    assert ref["title_defenses"]["Champ A"] == 8
+    # stripped by a title fight between two others
+    assert ref["current_champions"]["Welterweight"] == "WW New"
+    assert {"Great", "Zero Champ", "FW Champ", "LW Zero"} <= ref["former_champions"]
+    assert ref["records"]["Draw A"] == {"W": 0, "L": 0, "D": 2}
+    assert ref["records"]["Draw B"] == {"W": 0, "L": 0, "D": 1}
+    assert ref["fcount"]["Gatekeeper"] == 30
+
+
+def test_incremental_replay_matches_full(fights_csv, tmp_path):
+    f = load_fights(fights_csv)
+    partial = tmp_path / "partial.csv"
+    f.iloc[:-20].iloc[::-1].assign(Date=f["Date"].dt.strftime("%B %d, %Y")).to_csv(partial, index=False)
+    engine = EloEngine()
+    engine._manual_champs = {}
+    engine.load_fights(str(partial))
+    engine.replay()
+    engine.export(str(tmp_path / "checkpoint.json"), str(tmp_path))
+
+    resumed = EloEngine()
+    resumed._manual_champs = {}
+    resumed.load_fights(fights_csv)
+    resumed.replay(incremental=True, checkpoint_path=str(tmp_path / "checkpoint.json"), data_dir=str(tmp_path))
+    full = replayed(fights_csv)
+    np.testing.assert_array_equal(resumed.fights[ELO_COLS].to_numpy(), full.fights[ELO_COLS].to_numpy())
+    assert resumed.state == full.state
+
+
+def test_apply_fight_matches_a_replay_with_that_fight(fights_csv, tmp_path):
+    f = load_fights(fights_csv)
+    partial = tmp_path / "partial.csv"
+    f.iloc[:-1].iloc[::-1].assign(Date=f["Date"].dt.strftime("%B %d, %Y")).to_csv(partial, index=False)
+    engine = replayed(str(partial))
+    last = f.iloc[-1]
+    result = engine.apply_fight(last["Fighter 1"], last["Fighter 2"], last["Winner"], last["method"], last["Round"],
+                                last["Weight Class"], last["Is_Title_Fight"], last["Is_Main_Event"], last["Date"])
+    full = replayed(fights_csv)
+    assert result == tuple(full.fights[ELO_COLS].iloc[-1])
+    assert engine.state["elo"] == full.state["elo"]
+
+
+def test_apply_fight_needs_loaded_fights():
+    with pytest.raises(RuntimeError, match="load_fights"):
+        EloEngine().apply_fight("A", "B", "A")
+    with pytest.raises(RuntimeError, match="load_fights"):
+        EloEngine().replay()
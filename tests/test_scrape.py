@@ -0,0 +1,165 @@
+import os
+import pandas as pd
+import pytest
+import scrape_ufc_fights_enhanced as scraper
+from elo_engine import EloEngine
+from scrape_ufc_fights_enhanced import append_journal, events_to_scrape, merge_fights, parse_fights_lxml, read_journal
+from storage import fights_csv, parquet_path, read_table, typed_fights, write_table
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "event_pages")
+
+
+def page_fights(page, event, date, url):
+    with open(os.path.join(PAGES_DIR, page), "r", encoding="utf-8") as f:
+        return parse_fights_lxml(f.read(), event, date, url)
+
+
+def events_frame(*events):
+    return pd.DataFrame(events, columns=["Event", "Date", "URL"])
+
+
+def test_merge_fights_keeps_rows_without_a_round():
+    url = "http://ufcstats.com/event-details/upcoming"
+    events = events_frame(("UFC 310", "December 07, 2024", url))
+    df = merge_fights(None, page_fights("upcoming.html", "UFC 310", "December 07, 2024", url), {url}, events)
+    assert len(df) == 2
+    assert df["Round"].isna().all()
+
+
+def test_blank_round_survives_the_csv_and_the_replay(tmp_path):
+    url = "http://ufcstats.com/event-details/upcoming"
+    events = events_frame(("UFC 310", "December 07, 2024", url), ("UFC 300", "April 13, 2024", "http://ufcstats.com/event-details/300"))
+    fights = page_fights("upcoming.html", "UFC 310", "December 07, 2024", url) + \
+        page_fights("title_card.html", "UFC 300", "April 13, 2024", "http://ufcstats.com/event-details/300")
+    df = merge_fights(None, fights, {url}, events)
+    path = str(tmp_path / "fights_enhanced.csv")
+    write_table(df, path, fights_csv(df))
+    os.remove(parquet_path(path))
+
+    back = read_table(path, typed_fights)
+    assert back["Round"].isna().sum() == 2
+    assert back["Round"].dropna().tolist() == [1, 5, 5, 1]
+    engine = EloEngine()
+    engine.load_fights(path)
+    engine.replay()
+    assert len(engine.fights) == 6
+
+
+# five cards, newest first like ufc_events.csv
+EVENTS = events_frame(*[(f"UFC {n}", f"March {n:02d}, 2024", f"http://ufcstats.com/event-details/{n}") for n in (5, 4, 3, 2, 1)])
+
+
+def card(n, winner=None, bouts=2):
+    """Fight rows of event n in scraper order, fighter 1 wins unless `winner` says otherwise"""
+    rows = []
+    for b in range(bouts):
+        f1, f2 = f"Fighter {n}{b}A", f"Fighter {n}{b}B"
+        rows.append([f"UFC {n}", f"March {n:02d}, 2024", "Lightweight", f1, f2, winner or f1, "U-DEC", "3", "5:00",
+                     f"http://ufcstats.com/event-details/{n}", f"http://ufcstats.com/fight-details/{n}{b}", "DEC", False, b == 0])
+    return rows
+
+
+def existing_fights(*events):
+    return merge_fights(None, [row for n in events for row in card(n)], set(), EVENTS)
+
+
+def test_events_to_scrape_picks_the_new_events():
+    existing = existing_fights(3, 2, 1)
+    assert events_to_scrape(EVENTS, existing)["Event"].tolist() == ["UFC 5", "UFC 4"]
+    # re-checks the most recent known cards, not the oldest
+    assert events_to_scrape(EVENTS, existing, recheck=2)["Event"].tolist() == ["UFC 5", "UFC 4", "UFC 3", "UFC 2"]
+    assert events_to_scrape(EVENTS, existing_fights(5, 4, 3, 2, 1)).empty
+
+
+def test_merge_replaces_rechecked_events_in_event_order():
+    existing = existing_fights(3, 2, 1)
+    # UFC 3 re-scraped with an overturned result, UFC 2 re-check failed so its rows stay
+    fights = card(5) + card(4) + card(3, winner="NC")
+    df = merge_fights(existing, fights, {f"http://ufcstats.com/event-details/{n}" for n in (5, 4, 3)}, EVENTS)
+
+    assert df["Event"].tolist() == ["UFC 5"] * 2 + ["UFC 4"] * 2 + ["UFC 3"] * 2 + ["UFC 2"] * 2 + ["UFC 1"] * 2
+    assert not df.duplicated(["Fight URL"]).any()
+    assert df.loc[df["Event"] == "UFC 3", "Winner"].tolist() == ["NC", "NC"]
+    assert df.loc[df["Event"] == "UFC 2", "Winner"].tolist() == ["Fighter 20A", "Fighter 21A"]
+    # bouts keep their order within a card
+    assert df.loc[df["Event"] == "UFC 4", "Is_Main_Event"].tolist() == [True, False]
+    pd.testing.assert_series_equal(df.dtypes, existing.dtypes)
+
+
+def test_merge_drops_a_bout_gone_from_a_rechecked_card():
+    existing = existing_fights(2, 1)
+    df = merge_fights(existing, card(2, bouts=1), {"http://ufcstats.com/event-details/2"}, EVENTS)
+    assert df["Fight URL"].tolist() == ["http://ufcstats.com/fight-details/20"] + [f"http://ufcstats.com/fight-details/1{b}" for b in range(2)]
+
+
+@pytest.fixture
+def scrape_to(tmp_path, monkeypatch):
+    """scrape_all_fights() writing into tmp_path, with event pages served from card() and the fetches of the last run recorded"""
+    EVENTS.to_csv(tmp_path / "ufc_events.csv", index=False)
+    monkeypatch.setattr(scraper, "EVENTS_PATH", str(tmp_path / "ufc_events.csv"))
+    monkeypatch.setattr(scraper, "OUT_PATH", str(tmp_path / "fights_enhanced.csv"))
+    fetched = []
+
+    def run(crash_at=None, **kwargs):
+        def parse(event_name, event_date, event_url, fetcher, ttl, parser):
+            n = int(event_url.rsplit("/", 1)[1])
+            if n == crash_at:
+                raise KeyboardInterrupt  # not caught like a failed page, the run dies here
+            fetched.append(n)
+            return card(n)
+        monkeypatch.setattr(scraper, "parse_event_fights", parse)
+        fetched.clear()
+        scraper.scrape_all_fights(workers=1, rate=0, cache=False, **kwargs)
+        return read_table(scraper.OUT_PATH, typed_fights)
+
+    run.fetched = fetched
+    run.journal = scraper.journal_path(str(tmp_path / "fights_enhanced.csv"))
+    return run
+
+
+def test_read_journal_drops_a_torn_last_record(tmp_path):
+    path = str(tmp_path / "fights_enhanced.journal.jsonl")
+    with open(path, "w") as fp:
+        append_journal(fp, "a", [["row a"]])
+        append_journal(fp, "b", [["row b"]])
+        fp.write('{"url": "c", "fights": [["ro')
+    assert read_journal(path) == {"a": [["row a"]], "b": [["row b"]]}
+    # cut back to the last whole record, so the next append starts on its own line
+    with open(path, "a") as fp:
+        append_journal(fp, "c", [])
+    assert read_journal(path) == {"a": [["row a"]], "b": [["row b"]], "c": []}
+    assert read_journal(str(tmp_path / "missing.jsonl")) == {}
+
+
+def test_resume_after_a_crash_fetches_only_the_rest(scrape_to):
+    with pytest.raises(KeyboardInterrupt):
+        scrape_to(crash_at=3)
+    # the pool may have fetched later pages too, only the ones before the crash made it into the journal
+    assert list(read_journal(scrape_to.journal)) == [f"http://ufcstats.com/event-details/{n}" for n in (5, 4)]
+    assert not os.path.exists(scraper.OUT_PATH)
+
+    df = scrape_to()
+    assert scrape_to.fetched == [3, 2, 1]
+    assert df["Event"].tolist() == [f"UFC {n}" for n in (5, 4, 3, 2, 1) for _ in range(2)]
+    # folded into the table, then removed
+    assert not os.path.exists(scrape_to.journal)
+
+
+def test_resume_after_a_torn_journal_write(scrape_to):
+    with pytest.raises(KeyboardInterrupt):
+        scrape_to(crash_at=2)
+    # the crash hit halfway through writing UFC 3's record
+    with open(scrape_to.journal, "rb+") as fp:
+        fp.truncate(os.path.getsize(scrape_to.journal) - 20)
+    df = scrape_to()
+    assert scrape_to.fetched == [3, 2, 1]
+    assert not df.duplicated(["Fight URL"]).any() and len(df) == 10
+    assert not os.path.exists(scrape_to.journal)
+
+
+def test_incremental_run_leaves_no_journal(scrape_to):
+    scrape_to()
+    df = scrape_to(incremental=True, recheck=1)
+    assert scrape_to.fetched == [5]
+    assert len(df) == 10
+    assert not os.path.exists(scrape_to.journal)
@@ -0,0 +1,70 @@
+import pytest
+from search import SearchIndex, prefix_distance
+
+NAMES = ["Khabib Nurmagomedov", "Umar Nurmagomedov", "Jiří Procházka", "Sean O'Malley", "Sean O’Neil",
+         "Khalil Rountree Jr.", "T.J. Dillashaw", "Marlon Vera", "Jon Jones", "Jose Aldo", "Alex Pereira", "Ryan Hall"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SearchIndex(NAMES)
+
+
+def names(hits):
+    return [NAMES[i] for i in hits]
+
+
+@pytest.mark.parametrize("query", [
+    "khabbib",  # insertion
+    "khbib",  # deletion
+    "khabob",  # substitution
+    "khabib nurmagomedv",  # a deletion in a later word
+    "khabbib nurmagomedov",  # an insertion in the first word of the whole name
+    "khabib nurmaggomedov",
+])
+def test_fuzzy_finds_one_typo(index, query):
+    assert names(index.fuzzy(query))[0] == "Khabib Nurmagomedov"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("perira", ["Alex Pereira"]),
+    ("nurmagomedv", ["Khabib Nurmagomedov", "Umar Nurmagomedov"]),  # a later word, best ranked first
+    ("prochazkka", ["Jiří Procházka"]),
+])
+def test_fuzzy_matches_word_prefixes(index, query, expected):
+    assert names(index.fuzzy(query)) == expected
+
+
+def test_fuzzy_stays_within_the_typo_budget(index):
+    assert index.fuzzy("khxbxb") == []
+    assert index.fuzzy("kh") == []
+    # the first letter has to be right
+    assert index.fuzzy("xhabib") == []
+
+
+def test_prefix_distance():
+    assert prefix_distance("khabbib", "khabib nurmagomedov", 1) == 1
+    assert prefix_distance("khbib", "khabib nurmagomedov", 1) == 1
+    assert prefix_distance("khabib", "khabib nurmagomedov", 1) == 0
+    assert prefix_distance("khabib", "khab", 1) == 2
+    assert prefix_distance("khabib", "jon jones", 2) == 3
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("o'", ["Sean O'Malley", "Sean O’Neil"]),  # the apostrophe has to match, curly or straight
+    ("o’m", ["Sean O'Malley"]),
+    ("omalley", ["Sean O'Malley"]),  # and is optional when left out
+    ("jr.", ["Khalil Rountree Jr."]),
+    (".", ["Khalil Rountree Jr.", "T.J. Dillashaw"]),
+    ("t.j", ["T.J. Dillashaw"]),
+    ("prochaz", ["Jiří Procházka"]),  # accents folded both ways
+    ("PROCHÁZ", ["Jiří Procházka"]),
+    ("jon", ["Jon Jones"]),
+    ("ryan hall", ["Ryan Hall"]),
+    ("a.l", []),
+    ("-", []),
+    ("", []),
+    ("   ", []),
+])
+def test_contains_punctuation_rules(index, query, expected):
+    assert names(index.contains(query)) == expected
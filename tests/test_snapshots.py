@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+import baseline
+from conftest import days_ago
+from elo_engine import build_snapshots, load_fights, write_snapshots
+from rating_snapshots import RatingSnapshots
+from synthetic_fights import generate_fights
+
+
+def reference_board(f, as_of):
+    """The as_of leaderboard from the per-row replay of the fights up to `as_of`, champions from its title lineage"""
+    ref = pd.Timestamp(as_of)
+    fights = f[f["Date"] <= ref].reset_index(drop=True)
+    state = baseline.replay(fights)
+    champions = set(state["current_champions"].values())
+    # each fighter's last fight, in replay order
+    last = {}
+    for i, row in fights.iterrows():
+        last[row["Fighter 1"]] = last[row["Fighter 2"]] = row
+    board = {}
+    for name, elo in state["elo"].items():
+        row = last[name]
+        if (ref - row["Date"]).days >= baseline.retirement_threshold_days:
+            continue
+        champion = name in champions
+        defenses = state["title_defenses"].get(name, 0) if champion else 0
+        former = name in state["former_champions"] and not champion
+        elo = baseline.apply_decay(elo, row["Date"], ref, champion)
+        elo *= baseline.get_championship_boost(champion, defenses, former)
+        record = state["records"][name]
+        if champion and record["L"] == 0 and record["W"] >= 8:
+            elo *= 1.08
+        board[name] = {
+            "Elo": elo, "Last_Fight": row["Date"].value // 10 ** 6, "Weight Class": row["Weight Class"],
+            "Status": f"Champion ({defenses} defenses)" if champion else "Former Champion" if former else None,
+            "Record": f"{record['W']}-{record['L']}-{record['D']}",
+        }
+    return board
+
+
+def assert_board(snapshots, f, as_of):
+    got = snapshots.current(as_of)
+    want = reference_board(f, as_of)
+    assert [r["Elo"] for r in got] == sorted((r["Elo"] for r in got), reverse=True)
+    assert sorted(r["Fighter"] for r in got) == sorted(want)
+    for r in got:
+        expected = want[r["Fighter"]]
+        assert r["Elo"] == pytest.approx(expected["Elo"], rel=1e-12, abs=1e-9)
+        assert {k: r[k] for k in expected if k != "Elo"} == {k: v for k, v in expected.items() if k != "Elo"}
+
+
+@pytest.fixture
+def history(request, fights_csv, tmp_path):
+    path = fights_csv
+    if request.param == "synthetic":
+        path = str(tmp_path / "synthetic.csv")
+        generate_fights(3000, seed=1).to_csv(path, index=False)
+    f = load_fights(path)
+    write_snapshots(build_snapshots(f), str(tmp_path / "elo_snapshots.npz"))
+    return f, RatingSnapshots(str(tmp_path / "elo_snapshots.npz"))
+
+
+def as_date(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+@pytest.mark.parametrize("history", ["edge_cases"], indirect=True)
+@pytest.mark.parametrize("as_of", ["2010-02-28", "2010-03-01", "2011-06-01", "2016-01-01", str(days_ago(601)),
+                                   str(days_ago(600)), str(days_ago(1)), str(days_ago(0)), "2025-06-30"])
+def test_current_matches_a_truncated_replay(history, as_of):
+    f, snapshots = history
+    assert_board(snapshots, f, as_of)
+
+
+@pytest.mark.parametrize("history", ["edge_cases", "synthetic"], indirect=True)
+def test_current_at_keyframe_boundaries(history):
+    f, snapshots = history
+    kf_date = snapshots.data["kf_date"][1:]
+    assert len(kf_date) >= 3
+    # the day before, of and after a keyframe, for the first, a middle and the last one
+    for day in kf_date[[0, len(kf_date) // 2, -1]]:
+        for offset in (-1, 0, 1):
+            assert_board(snapshots, f, as_date(day + offset))
+
+
+@pytest.mark.parametrize("history", ["edge_cases"], indirect=True)
+def test_current_outside_the_history(history):
+    f, snapshots = history
+    first, last = f["Date"].min(), f["Date"].max()
+    assert snapshots.current(str((first - pd.Timedelta(days=1)).date())) == []
+    assert snapshots.current("0001-01-01") == []
+    # everyone has retired two years after the last fight, far later is the same board
+    retired = str((last + pd.Timedelta(days=baseline.retirement_threshold_days)).date())
+    assert snapshots.current(retired) == snapshots.current("9999-12-31") == []
+    day_before = str((last + pd.Timedelta(days=baseline.retirement_threshold_days - 1)).date())
+    assert [r["Fighter"] for r in snapshots.current(day_before)] == ["W Champ", "W Opp 9"]
+    assert_board(snapshots, f, day_before)
@@ -0,0 +1,136 @@
+import json, os, shutil
+import pytest
+import store
+from publish import KEEP_RELEASES, MANIFEST_NAME, publish_release, read_manifest, write_json_atomic
+from store import Bundle, BundleStore
+
+
+class Inline:
+    """threading.Thread stand-in that runs the target on start(), so a reload is done when get() returns"""
+
+    def __init__(self, target, args=(), daemon=None):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def release(export_dir, tmp_path, monkeypatch):
+    """publish(edit=None) puts a copy of the edge case outputs into a release under tmp_path/data,
+    edit(sources) can change the copies first. Returns the manifest"""
+    monkeypatch.setattr(store.threading, "Thread", Inline)
+    manifest = read_manifest(export_dir)
+    directory = os.path.join(export_dir, manifest["path"])
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+
+    def publish(edit=None, keep=KEEP_RELEASES):
+        sources = tmp_path / "sources"
+        shutil.rmtree(sources, ignore_errors=True)
+        sources.mkdir()
+        for name in manifest["files"]:
+            shutil.copyfile(os.path.join(directory, name), sources / name)
+        if edit:
+            edit(sources)
+        return publish_release([str(sources / name) for name in manifest["files"]], data_dir=str(data_dir), keep=keep)
+
+    publish.data_dir = str(data_dir)
+    return publish
+
+
+def drop_fighters(n):
+    """An edit that leaves the first n fighters off the current board"""
+    def edit(sources):
+        path = sources / "current_elo_2.0.json"
+        path.write_text(json.dumps(json.loads(path.read_text())[n:]))
+    return edit
+
+
+def truncate(name, keep=0.5):
+    def edit(sources):
+        data = (sources / name).read_bytes()
+        (sources / name).write_bytes(data[:int(len(data) * keep)])
+    return edit
+
+
+def test_a_new_release_is_swapped_in(release):
+    first = release()
+    bundles = BundleStore(release.data_dir, interval=0)
+    old = bundles.get()
+    assert old.version == first["version"]
+    board = old.part("current").records
+
+    second = release(drop_fighters(1))
+    new = bundles.get()
+    assert new.version == second["version"] != first["version"]
+    assert new.part("current").records == board[1:]
+    # the old bundle is left whole for requests still holding it
+    assert old.part("current").records == board
+    assert bundles.get() is new
+
+
+def test_only_checks_the_manifest_every_interval(release):
+    release()
+    bundles = BundleStore(release.data_dir, interval=3600)
+    old = bundles.get()
+    release(drop_fighters(1))
+    assert bundles.get() is old
+
+
+@pytest.mark.parametrize("name", ["current_elo_2.0.json", "fight_trends_2.0.json", "elo_snapshots.npz"])
+@pytest.mark.parametrize("keep", [0, 0.5, 0.99])
+def test_a_truncated_release_is_never_served(release, name, keep):
+    release()
+    bundles = BundleStore(release.data_dir, interval=0)
+    good = bundles.get()
+    assert not good.failed
+
+    broken = release(truncate(name, keep))
+    assert bundles.get() is good
+    assert Bundle(os.path.join(release.data_dir, broken["path"]), broken["version"]).failed
+    # and the next good one is
+    fixed = release(drop_fighters(2))
+    assert bundles.get().version == fixed["version"]
+
+
+def test_a_pruned_or_unfinished_release_is_never_served(release):
+    release()
+    bundles = BundleStore(release.data_dir, interval=0)
+    good = bundles.get()
+    # the manifest pointing at a release that isn't there (pruned, or its rename not done yet)
+    manifest = {**read_manifest(release.data_dir), "version": "gone", "path": "releases/gone"}
+    write_json_atomic(manifest, os.path.join(release.data_dir, MANIFEST_NAME))
+    assert bundles.get() is good
+    # a release being assembled isn't looked at until the manifest names it
+    tmp = os.path.join(release.data_dir, "releases", ".tmp-next-1")
+    os.makedirs(tmp)
+    with open(os.path.join(tmp, "current_elo_2.0.json"), "w") as f:
+        f.write('[{"Fighter": ')
+    assert bundles.get() is good
+    assert release(drop_fighters(1))["version"] == bundles.get().version
+
+
+def test_first_load_of_a_broken_release_still_serves_the_rest(release):
+    manifest = release(truncate("elo_snapshots.npz"))
+    bundle = BundleStore(release.data_dir).get()
+    assert bundle.version == manifest["version"]
+    assert bundle.failed == {"history"}
+    assert bundle.part("current").records
+    with pytest.raises(store.BUILD_ERRORS):
+        bundle.part("history")
+
+
+def test_publishing_keeps_the_newest_releases(release):
+    versions = [release(drop_fighters(n))["version"] for n in range(5)]
+    releases = os.path.join(release.data_dir, "releases")
+    assert sorted(os.listdir(releases)) == sorted(versions[-KEEP_RELEASES:])
+    assert read_manifest(release.data_dir)["version"] == versions[-1]
+    # unchanged outputs reuse their release
+    assert release(drop_fighters(4))["version"] == versions[-1]
+    assert len(os.listdir(releases)) == KEEP_RELEASES
+    # the current release is kept even when it's the oldest
+    os.utime(os.path.join(releases, versions[2]), (0, 0))
+    assert release(drop_fighters(2), keep=1)["version"] == versions[2]
+    assert sorted(os.listdir(releases)) == sorted([versions[2], versions[4]])
+
@@ -1,28 +1,69 @@
-import subprocess, os
+import os, sys, argparse
 from datetime import datetime
 
-print("\nStarting weekly update\n")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from pipeline import Stage, run_pipeline
+from instrument import configure
+from scrape_ufc_events import scrape_ufc_events
+from scrape_ufc_fights_enhanced import scrape_all_fights
+from scrape_fighter_photos import sync_photos
+from optimize_fighter_photos import optimize_photos
+from elo_engine import EloEngine
 
-# run scrapers
-scripts = [
-    "src/scrape_ufc_events.py",
-    "src/scrape_ufc_fights.py",
-    "src/initial_tracker.py"
+PHOTO_TOP = 100  # photos for the top N of the current and peak boards
+
+ELO_OUTPUTS = [
+    "data/current_elo_2.0.csv", "data/peak_elo_2.0.csv", "data/current_elo_2.0.json", "data/peak_elo_2.0.json",
+    "data/fights_with_elo_2.0.csv", "data/fight_trends_2.0.json", "data/elo_snapshots.npz", "data/elo_checkpoint.json",
 ]
 
-for s in scripts:
-    if os.path.exists(s):
-        print(f"Running {s} ...")
-        subprocess.run(["python3", s], check=True)
-    else:
-        print(f"Skipped {s} (file not found)")
+def update_elo():
+    # only the fights added since the last checkpoint get replayed
+    engine = EloEngine()
+    engine.load_fights()
+    engine.replay(incremental=True)
+    engine.export()
+
+STAGES = [
+    Stage("events", scrape_ufc_events, outputs=["data/ufc_events.csv"], always=True),
+    # only new events, plus the last few cards again in case a result was overturned
+    Stage("fights", lambda: scrape_all_fights(incremental=True, recheck=3),
+          inputs=["data/ufc_events.csv"], outputs=["data/fights_enhanced.csv"], always=True),
+    Stage("elo", update_elo,
+          inputs=["data/fights_enhanced.csv", "data/manual_champions.csv", "src/elo_engine.py",
+                  "src/elo_kernel.py", "src/rating_snapshots.py"], outputs=ELO_OUTPUTS),
+    # reads the last published leaderboards, so it runs alongside the scrapers and the Elo rebuild
+    Stage("photos", lambda: sync_photos(top=PHOTO_TOP),
+          outputs=["frontend/public/fighters/*.jpg", "frontend/public/fighters/fighter_photos.json"], always=True),
+    Stage("optimize", optimize_photos,
+          inputs=["frontend/public/fighters/*.jpg", "src/optimize_fighter_photos.py"],
+          outputs=["frontend/public/fighters/optimized/*"]),
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weekly update: scrape, rebuild Elo, refresh photos, commit and push")
+    parser.add_argument("--force", action="store_true", help="run every stage, even the up to date ones")
+    parser.add_argument("--no-commit", action="store_true", help="leave the results uncommitted")
+    parser.add_argument("--trace", metavar="FILE", help="append timing spans to this JSON-lines file")
+    parser.add_argument("--profile", metavar="SPAN", action="append", default=[],
+                        help="cProfile spans with this name or glob (e.g. elo.replay), repeatable")
+    args = parser.parse_args()
+    configure(trace=args.trace, profile=args.profile or None)
+
+    print("\nStarting weekly update\n")
+    status = run_pipeline(STAGES, force=args.force)
+    print("\n" + ", ".join(f"{name}: {result}" for name, result in status.items()))
+    if any(result in ("failed", "blocked") for result in status.values()):
+        sys.exit("\nUpdate failed, nothing committed")
+    if args.no_commit:
+        sys.exit(0)
 
-# auto commit/push
-stamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-print("\nCommitting updated files")
+    # auto commit/push
+    stamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+    print("\nCommitting updated files")
 
-os.system("git add data/initial_current_elo.csv data/initial_peak_elo.csv data/elo_current.json data/elo_peak.json data/fights_with_elo.csv")
-os.system(f'git commit -m "update data ({stamp})"')
-os.system("git push origin main")
+    os.system("git add data/ufc_events.csv data/fights_enhanced.csv data/current_elo_2.0.csv data/peak_elo_2.0.csv data/current_elo_2.0.json data/peak_elo_2.0.json data/fights_with_elo_2.0.csv data/fight_trends_2.0.json data/elo_snapshots.npz frontend/public/fighters")
+    os.system(f'git commit -m "update data ({stamp})"')
+    os.system("git push origin main")
 
-print("\n Update complete, data pushed to github.\n")
+    print("\n Update complete, data pushed to github.\n")
@@ -1,5 +1,10 @@
-from flask import Flask, jsonify, send_from_directory, abort, request
-import os, json
+from flask import Flask, Response, jsonify, send_from_directory, abort, request, url_for, g
+import os, json, base64, binascii
+from bisect import bisect_right
+from datetime import date
+from store import BUILD_ERRORS, BundleStore, Payload, ENCODERS, MIN_COMPRESS_BYTES
+from search import MAX_RESULTS
+from instrument import Span, metrics
 
 app = Flask(__name__)
 
@@ -8,80 +13,228 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', 'ETag,X-Total-Count,X-Next-Cursor,Link')
     return response
 
+# every request is timed as a span named after its endpoint
+@app.before_request
+def start_span():
+    g.span = Span(f"web.{request.endpoint or 'unmatched'}", method=request.method).start()
+
+@app.after_request
+def tag_span(response):
+    if "span" in g:
+        g.span.set(status=response.status_code, bytes=response.content_length)
+    return response
+
+@app.teardown_request
+def finish_span(error=None):
+    span = g.pop("span", None)
+    if span is not None:
+        span.finish(error)
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
-def read_json(path):
+bundles = BundleStore(DATA_DIR)
+
+# browsers reuse a response for a minute, then revalidate it with If-None-Match
+CACHE_CONTROL = "public, max-age=60, must-revalidate"
+NO_TRENDS = Payload([])
+
+def send(payload):
+    """Payload as a response: 304 when the client's copy is current, else the best encoding it accepts"""
+    encoding = None
+    if len(payload.body) >= MIN_COMPRESS_BYTES:
+        encoding = request.accept_encodings.best_match(list(ENCODERS))
+    # one strong ETag per representation, any of them means the client has this version
+    etag = payload.etag if encoding is None else f"{payload.etag}-{encoding}"
+    inm = request.if_none_match
+    if inm.star_tag or any(tag.split("-")[0] == payload.etag for tag in inm.as_set(include_weak=True)):
+        response = Response(status=304)
+    else:
+        response = Response(payload.body if encoding is None else payload.encoded(encoding), mimetype="application/json")
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+def load(name, bundle=None, missing=None):
+    """One part of the current bundle, pass `bundle` to read several parts from the same version"""
+    bundle = bundle or bundles.get()
     try:
-        with open(path, "r") as f:
-            return json.load(f)
+        return bundle.part(name)
     except FileNotFoundError:
-        abort(404, description=f"File not found: {path}")
+        abort(404, description=missing or f"File not found: {bundle.path(name)}")
     except json.JSONDecodeError:
-        abort(500, description=f"Invalid JSON format: {path}")
+        abort(500, description=f"Invalid JSON format: {bundle.path(name)}")
+    except BUILD_ERRORS:
+        abort(500, description=f"Unreadable data file: {bundle.path(name)}")
 
 @app.route("/api/current", methods=["GET"])
 def get_current():
-    data_path = os.path.join(DATA_DIR, "current_elo_2.0.json")
-    data = read_json(data_path)
-
-    search_query = request.args.get('search', '').lower()
-    weight_class = request.args.get('weight_class', '').lower()
-    limit = request.args.get('limit', type=int)
-
-    if search_query:
-        data = [f for f in data if search_query in f["Fighter"].lower()]
-
-    if weight_class and weight_class != 'all':
-        data = [f for f in data if f.get("Weight Class", "").lower() == weight_class]
-
-    if limit and limit > 0:
-        data = data[:limit]
+    as_of = request.args.get('as_of')
+    if as_of:
+        try:
+            as_of = date.fromisoformat(as_of)
+        except ValueError:
+            abort(400, description="as_of must be a YYYY-MM-DD date")
+        snapshot = load("history")(as_of)
+    else:
+        snapshot = load("current")
+
+    return serve_leaderboard(snapshot)
+
+def encode_cursor(sort, fighter):
+    return base64.urlsafe_b64encode(json.dumps([sort, fighter]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        sort, fighter = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        abort(400, description="Invalid cursor")
+    return sort, fighter
+
+def serve_leaderboard(snapshot):
+    """Leaderboard query: weight_class/search filters, sort=[-]field, offset or cursor, limit, fields=a,b.
+
+    Totals go in X-Total-Count, the next page in X-Next-Cursor and Link. Cursors point after the
+    last fighter sent, so they survive a data reload.
+    """
+    args = request.args
+    search_query = args.get('search', '').lower()
+    weight_class = args.get('weight_class', '').lower()
+    if weight_class == 'all':
+        weight_class = ''
+    limit = args.get('limit', type=int)
+    offset = args.get('offset', 0, type=int)
+    cursor = args.get('cursor')
+    sort = args.get('sort') or "-" + snapshot.sort_key
+    fields = [f for f in args.get('fields', '').split(',') if f]
+
+    # the full list and whole weight classes are what the frontend asks for, those are precomputed
+    if not (search_query or (limit and limit > 0) or offset or cursor or fields or 'sort' in args):
+        response = send(snapshot.payload(weight_class or None))
+        rows = snapshot.by_weight_class.get(weight_class, []) if weight_class else snapshot.records
+        response.headers["X-Total-Count"] = str(len(rows))
+        return response
+
+    ordering = snapshot.ordering(sort)
+    if ordering is None:
+        abort(400, description=f"Can't sort by {sort}")
+    unknown = set(fields) - set(snapshot.fields)
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(sorted(unknown))}")
+    if offset < 0:
+        abort(400, description="offset can't be negative")
+
+    rows, positions = ordering
+    if weight_class or search_query:
+        keep = None
+        if weight_class:
+            keep = {id(r) for r in snapshot.by_weight_class.get(weight_class, [])}
+        if search_query:
+            found = {id(snapshot.records[i]) for i in snapshot.search.contains(search_query)}
+            keep = found if keep is None else keep & found
+        if keep is not None:
+            rows = [r for r in rows if id(r) in keep]
+
+    start = offset
+    if cursor:
+        cursor_sort, after = decode_cursor(cursor)
+        last = snapshot.by_name.get(str(after).lower())
+        if cursor_sort != sort or last is None:
+            abort(400, description="Cursor doesn't match this query or data anymore")
+        # rows keep the ordering's order, so positions are increasing
+        start = bisect_right([positions[id(r)] for r in rows], positions[id(last)])
+
+    total = len(rows)
+    end = start + limit if limit and limit > 0 else total
+    page = rows[start:end]
+
+    response = jsonify([{f: r.get(f) for f in fields} for r in page] if fields else page)
+    response.headers["X-Total-Count"] = str(total)
+    if page and end < total:
+        next_cursor = encode_cursor(sort, page[-1]["Fighter"])
+        next_args = {k: v for k, v in args.items() if k != "offset"}
+        next_args["cursor"] = next_cursor
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{url_for(request.endpoint, **next_args)}>; rel="next"'
+    return response
 
-    return jsonify(data)
+@app.route("/api/predict", methods=["POST"])
+def predict():
+    """{"pairs": [[fighter1, fighter2], ...]} for chosen matchups of active fighters, or {"weight_class": ...} for every pairing in a division"""
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description="Expected a JSON object")
+    snapshot = load("current")
+
+    if "weight_class" in body:
+        if not isinstance(body["weight_class"], str):
+            abort(400, description="weight_class must be a string")
+        return send(snapshot.matchup_matrix(body["weight_class"]))
+
+    pairs = body.get("pairs")
+    if not isinstance(pairs, list) or not all(
+            isinstance(p, list) and len(p) == 2 and all(isinstance(n, str) for n in p) for p in pairs):
+        abort(400, description="pairs must be a list of [fighter1, fighter2] name pairs")
+    unknown = sorted({name for pair in pairs for name in pair if name.lower() not in snapshot.positions})
+    if unknown:
+        abort(400, description=f"Unknown fighters: {', '.join(unknown)}")
+    probabilities = snapshot.predict(pairs)
+    return jsonify([
+        {"fighter1": a, "fighter2": b, "fighter1_win": p, "fighter2_win": 1 - p}
+        for (a, b), p in zip(pairs, probabilities)
+    ])
 
 @app.route("/api/peak", methods=["GET"])
 def get_peak():
-    data_path = os.path.join(DATA_DIR, "peak_elo_2.0.json")
-    return jsonify(read_json(data_path))
+    return serve_leaderboard(load("peak"))
 
 @app.route("/api/fighter/<string:name>", methods=["GET"])
 def get_fighter(name):
-    data_path = os.path.join(DATA_DIR, "current_elo_2.0.json")
-    data = read_json(data_path)
-    results = [f for f in data if f["Fighter"].lower() == name.lower()]
-    if not results:
+    snapshot = load("current")
+    fighter = snapshot.by_name.get(name.lower())
+    if fighter is None:
+        i = snapshot.search.find(name)
+        fighter = None if i is None else snapshot.records[i]
+    if fighter is None:
         abort(404, description=f"Fighter not found: {name}")
-    return jsonify(results[0])
+    return jsonify(fighter)
+
+@app.route("/api/search", methods=["GET"])
+def search():
+    """Typeahead over every fighter who ever had a rating, ?q=<typed so far>&limit=<n>"""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_RESULTS))
+    bundle = bundles.get()
+    peak = load("peak", bundle)
+    current = load("current", bundle)
+    results = []
+    for i in peak.search.typeahead(query, limit):
+        r = peak.records[i]
+        now = current.by_name.get(r["Fighter"].lower())
+        results.append({
+            "Fighter": r["Fighter"],
+            "Weight Class": r.get("Weight Class"),
+            "Peak Elo": r.get("Peak Elo"),
+            "Elo": now["Elo"] if now else None,  # None for inactive fighters
+        })
+    return jsonify(results)
 
 @app.route("/api/trends/<string:name>", methods=["GET"])
 def get_trends(name):
-    path = os.path.join(DATA_DIR, "fights_with_elo_2.0.csv")
-    if not os.path.exists(path):
-        abort(404, description="Fight data not available")
-    import pandas as pd
-    df = pd.read_csv(path)
-    df = df[(df["Fighter 1"].str.lower() == name.lower()) | (df["Fighter 2"].str.lower() == name.lower())]
-
-    result_data = []
-    for _, row in df.iterrows():
-        is_fighter1 = row["Fighter 1"].lower() == name.lower()
-        result_data.append({
-            "Date": row["Date"],
-            "Opponent": row["Fighter 2"] if is_fighter1 else row["Fighter 1"],
-            "Result": "Win" if row["Winner"] == (row["Fighter 1"] if is_fighter1 else row["Fighter 2"]) else ("Draw" if row["Winner"] == "Draw" else "Loss"),
-            "Method": row["method"],
-            "Event": row["Event"],
-            "EloBefore": row["Fighter1_Elo_Start"] if is_fighter1 else row["Fighter2_Elo_Start"],
-            "EloAfter": row["Fighter1_Elo_End"] if is_fighter1 else row["Fighter2_Elo_End"],
-            "EloChange": (row["Fighter1_Elo_End"] - row["Fighter1_Elo_Start"]) if is_fighter1 else (row["Fighter2_Elo_End"] - row["Fighter2_Elo_Start"])
-        })
+    trends = load("trends", missing="Fight data not available")
+    return send(trends.get(name.lower(), NO_TRENDS))
 
-    import json
-    return json.dumps(result_data)
+@app.route("/api/_metrics", methods=["GET"])
+def get_metrics():
+    """Span timings of this worker process since it started"""
+    return jsonify({**metrics(), "data_version": bundles.get().version})
 
 @app.route("/")
 def home():
@@ -0,0 +1,131 @@
+"""
+Fighter name search: prefix table for typeahead, n-gram postings for substring search and
+trigram candidates plus edit distance for typos. Names are folded first, so "jiri prochazka"
+finds "Jiří Procházka". Substring search still matches punctuation in the query literally.
+"""
+import re, unicodedata
+from collections import Counter
+
+MAX_RESULTS = 50  # most results a typeahead lookup returns
+GRAM_SIZES = (1, 2, 3)
+
+
+def loose(text):
+    """Lowercase and accents stripped, curly apostrophes made straight, other punctuation kept"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return re.sub(r"[\u2019`]", "'", text)
+
+
+def fold(text):
+    """loose(), then apostrophes stripped and any other run of non-alphanumerics turned into one space"""
+    text = loose(text).replace("'", "")  # O'Malley and OMalley fold the same
+    return " ".join(re.findall(r"[^\W_]+", text))
+
+
+def prefix_distance(a, b, limit):
+    """Smallest Levenshtein distance between a and b or any prefix of b, or limit + 1 when all are over limit"""
+    b = b[:len(a) + limit]
+    if len(b) < len(a) - limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    # prev[j] is the distance to b[:j], prefixes shorter than len(a) - limit are over limit anyway
+    return min(min(prev), limit + 1)
+
+
+class SearchIndex:
+    """Index over a ranked list of names, every lookup returns positions in that list, best ranked first"""
+
+    def __init__(self, names):
+        self.loose = [loose(n) for n in names]
+        self.folded = [fold(n) for n in names]
+        # the full name and the name from each later word on ("jiri prochazka", "prochazka")
+        self.keys = [[" ".join(words[w:]) for w in range(len(words))] for words in (n.split(" ") for n in self.folded)]
+        self.exact = {}
+        self.prefixes = {}  # prefix of the name or of any later word -> up to MAX_RESULTS positions
+        self.grams = {}  # n-gram -> positions of every name containing it
+        for i, name in enumerate(self.folded):
+            self.exact.setdefault(name, i)
+            for key in self.keys[i]:
+                for end in range(1, len(key) + 1):
+                    hits = self.prefixes.setdefault(key[:end], [])
+                    if len(hits) < MAX_RESULTS and (not hits or hits[-1] != i):
+                        hits.append(i)
+            for gram in {name[j:j + n] for n in GRAM_SIZES for j in range(len(name) - n + 1)}:
+                self.grams.setdefault(gram, []).append(i)
+        # padded trigrams, so fuzzy matching also weighs the start and end of words
+        self.trigrams = {}
+        for i, name in enumerate(self.folded):
+            for gram in self._trigrams(name):
+                self.trigrams.setdefault(gram, []).append(i)
+
+    @staticmethod
+    def _trigrams(text):
+        padded = f"  {text} "
+        return {padded[j:j + 3] for j in range(len(padded) - 2)}
+
+    def find(self, name):
+        """Position of a name, ignoring case, accents and punctuation"""
+        return self.exact.get(fold(name))
+
+    def prefix(self, query, limit=MAX_RESULTS):
+        """Names where the full name or one of its words starts with query"""
+        return self.prefixes.get(fold(query), [])[:limit]
+
+    def contains(self, query):
+        """Every name containing query, ignoring case and accents. Punctuation has to match as typed,
+        "o'" finds O'Malley, not every name with an o. A blank query matches nothing"""
+        q, raw = fold(query), loose(query)
+        if not raw.strip():
+            return []
+        if not q:
+            # only punctuation, which the n-grams don't index
+            return [i for i, name in enumerate(self.loose) if raw in name]
+        n = min(len(q), max(GRAM_SIZES))
+        postings = [self.grams.get(q[j:j + n], []) for j in range(len(q) - n + 1)]
+        hits = min(postings, key=len)
+        if len(q) > max(GRAM_SIZES):
+            hits = [i for i in hits if q in self.folded[i]]
+        if raw != q:
+            hits = [i for i in hits if raw in self.loose[i]]
+        return hits
+
+    def fuzzy(self, query, limit=MAX_RESULTS, candidates=40):
+        """Names within a typo or two of query, as a whole name or as a prefix of one of its words"""
+        q = fold(query)
+        if len(q) < 3:
+            return []
+        grams = self._trigrams(q)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigrams.get(gram, ()))
+        max_typos = 1 if len(q) < 8 else 2
+        # a typo breaks at most 3 of the query's trigrams
+        needed = len(grams) - 3 * max_typos
+        scored = []
+        for i, count in shared.most_common(candidates):
+            if count < needed:
+                break
+            # typos are rarely in the first letter, and checking it skips most of the work
+            d = min([prefix_distance(q, k, max_typos) for k in self.keys[i] if k[0] == q[0]] or [max_typos + 1])
+            if d <= max_typos:
+                scored.append((d, i))
+        return [i for _, i in sorted(scored)[:limit]]
+
+    def typeahead(self, query, limit=10):
+        """Prefix matches, then substring matches, then typo matches, without repeats"""
+        results = []
+        for lookup in (self.prefix, self.contains, self.fuzzy):
+            for i in lookup(query) or []:
+                if i not in results:
+                    results.append(i)
+                    if len(results) >= limit:
+                        return results
+        return results
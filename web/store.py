@@ -0,0 +1,238 @@
+"""
+In-memory copies of the tracker's JSON exports for the API.
+The tracker publishes its outputs as versioned releases behind data/manifest.json. All of a
+release is parsed and indexed at once into a Bundle, and a newer release replaces it in one swap.
+Responses are kept as Payloads: serialized once per data version, compressed on first use.
+"""
+import os, sys, json, gzip, time, zlib, hashlib, zipfile, threading
+import numpy as np
+import brotli
+from functools import lru_cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from elo_kernel import expected
+from rating_snapshots import RatingSnapshots
+from publish import read_manifest
+from instrument import span
+from search import SearchIndex
+
+# preferred first
+ENCODERS = {
+    "br": lambda body: brotli.compress(body, quality=11),
+    "gzip": lambda body: gzip.compress(body, 9, mtime=0),
+}
+MIN_COMPRESS_BYTES = 512  # smaller bodies go out as they are
+RELOAD_INTERVAL = 1.0  # seconds between manifest checks
+# what a missing, unreadable or truncated file fails with (JSONDecodeError is a ValueError)
+BUILD_ERRORS = (OSError, ValueError, EOFError, zipfile.BadZipFile, zlib.error)
+
+
+class Payload:
+    """A serialized JSON response with a strong ETag, compressed copies made on first request"""
+
+    def __init__(self, obj):
+        # same encoding as flask's jsonify
+        self.body = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode() + b"\n"
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = ENCODERS[encoding](self.body)
+        return data
+
+
+class Snapshot:
+    """One parsed version of a leaderboard file, never modified after it's built (payloads are memoized)"""
+
+    def __init__(self, records, sort_key):
+        self.sort_key = sort_key
+        self.records = sorted(records, key=lambda r: r.get(sort_key) or 0, reverse=True)
+        self.fields = list(self.records[0]) if self.records else [sort_key]
+        self.by_name = {}
+        self.by_weight_class = {}
+        self.positions = {}  # lowercase name -> row in records and ratings
+        for i, r in enumerate(self.records):
+            self.by_name.setdefault(r["Fighter"].lower(), r)
+            self.by_weight_class.setdefault((r.get("Weight Class") or "").lower(), []).append(r)
+            self.positions.setdefault(r["Fighter"].lower(), i)
+        self.ratings = np.array([r.get(sort_key) or 0 for r in self.records], dtype=float)
+        self._payloads = {}
+        self._orders = {}
+        self._search = None
+
+    @property
+    def search(self):
+        """SearchIndex over the fighter names, positions are rows of records"""
+        if self._search is None:
+            self._search = SearchIndex([r["Fighter"] for r in self.records])
+        return self._search
+
+    def _payload(self, key, make):
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = Payload(make())
+        return payload
+
+    def payload(self, weight_class=None):
+        """The full list, or one weight class of it"""
+        if weight_class is None:
+            return self._payload(None, lambda: self.records)
+        key = weight_class.lower()
+        return self._payload(("weight_class", key), lambda: self.by_weight_class.get(key, []))
+
+    def ordering(self, sort):
+        """(records in `sort` order, record id -> position) for sort like "Fighter" or "-Elo", None for unknown fields.
+        Missing values go last, ties keep the leaderboard order."""
+        if sort in self._orders:
+            return self._orders[sort]
+        field = sort[1:] if sort.startswith("-") else sort
+        if field not in self.fields:
+            return None
+        present = [r for r in self.records if r.get(field) is not None]
+        present.sort(key=lambda r: r[field].lower() if isinstance(r[field], str) else r[field], reverse=sort.startswith("-"))
+        rows = present + [r for r in self.records if r.get(field) is None]
+        order = self._orders[sort] = (rows, {id(r): i for i, r in enumerate(rows)})
+        return order
+
+    def predict(self, pairs):
+        """Win probability of the first fighter of each (fighter1, fighter2) pair, None where a name is unknown"""
+        i1 = np.array([self.positions.get(a.lower(), -1) for a, _ in pairs], dtype=int)
+        i2 = np.array([self.positions.get(b.lower(), -1) for _, b in pairs], dtype=int)
+        # unknown names index the trailing NaN
+        ratings = np.append(self.ratings, np.nan)
+        p = expected(ratings[i1], ratings[i2])
+        return [None if np.isnan(x) else float(x) for x in p]
+
+    def matchup_matrix(self, weight_class):
+        """Every pairing in a division, matrix[i][j] = chance fighters[i] beats fighters[j]"""
+        division = self.by_weight_class.get(weight_class.lower())
+        if not division:
+            # not memoized, any string can come in here
+            return Payload({"weight_class": weight_class, "fighters": [], "matrix": []})
+        # the division's own spelling, whatever casing was asked for
+        name = division[0]["Weight Class"]
+
+        def make():
+            rows = [self.positions[r["Fighter"].lower()] for r in division]
+            ratings = self.ratings[rows]
+            return {
+                "weight_class": name,
+                "fighters": [self.records[i]["Fighter"] for i in rows],
+                "matrix": expected(ratings[:, None], ratings[None, :]).tolist(),
+            }
+        return self._payload(("matrix", name), make)
+
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def build_trends(path):
+    """Lowercase fighter name -> Payload of that fighter's fight history"""
+    return {name: Payload(fights) for name, fights in read_json(path).items()}
+
+
+def build_history(path):
+    """elo_snapshots.npz, answers as_of dates with a leaderboard Snapshot, recently asked dates cached"""
+    snapshots = RatingSnapshots(path)
+
+    @lru_cache(maxsize=256)
+    def board(as_of):
+        return Snapshot(snapshots.current(as_of), "Elo")
+    return board
+
+
+# part name -> (file in the release, what it's turned into)
+PARTS = {
+    "current": ("current_elo_2.0.json", lambda path: Snapshot(read_json(path), "Elo")),
+    "peak": ("peak_elo_2.0.json", lambda path: Snapshot(read_json(path), "Peak Elo")),
+    "trends": ("fight_trends_2.0.json", build_trends),
+    "history": ("elo_snapshots.npz", build_history),
+}
+
+
+class Bundle:
+    """Every part built from one data version, never modified after it's built"""
+
+    def __init__(self, directory, version):
+        self.directory = directory
+        self.version = version
+        self._parts = {}
+        for name, (filename, build) in PARTS.items():
+            try:
+                with span(f"web.build.{name}"):
+                    self._parts[name] = build(os.path.join(directory, filename))
+            except BUILD_ERRORS as e:
+                self._parts[name] = e
+        self.failed = {name for name, part in self._parts.items() if isinstance(part, Exception)}
+
+    def path(self, name):
+        return os.path.join(self.directory, PARTS[name][0])
+
+    def part(self, name):
+        """The built part, raises the error it failed with (one of BUILD_ERRORS) if it couldn't be built"""
+        part = self._parts[name]
+        if isinstance(part, Exception):
+            raise part.with_traceback(None)
+        return part
+
+
+class BundleStore:
+    """The newest published Bundle. The manifest is checked at most every `interval` seconds and a
+    new version is built in the background, then swapped in whole, so every request sees one version."""
+
+    def __init__(self, data_dir, interval=RELOAD_INTERVAL):
+        self.data_dir = data_dir
+        self.interval = interval
+        self._bundle = None
+        self._next_check = 0.0
+        self._loading = None  # version being built
+        self._lock = threading.Lock()
+
+    def source(self):
+        """(directory, version) of the newest data"""
+        manifest = read_manifest(self.data_dir)
+        if manifest is not None:
+            return os.path.join(self.data_dir, manifest["path"]), manifest["version"]
+        # nothing published here (data deployed through git): the flat exports, versioned by mtime
+        mtimes = []
+        for filename, _ in PARTS.values():
+            try:
+                mtimes.append(os.stat(os.path.join(self.data_dir, filename)).st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return self.data_dir, tuple(mtimes)
+
+    def get(self):
+        if self._bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._bundle = Bundle(*self.source())
+                    self._next_check = time.monotonic() + self.interval
+        elif time.monotonic() >= self._next_check:
+            self._check()
+        return self._bundle
+
+    def _check(self):
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.interval
+            directory, version = self.source()
+            if version in (self._bundle.version, self._loading):
+                return
+            self._loading = version
+        threading.Thread(target=self._load, args=(directory, version), daemon=True).start()
+
+    def _load(self, directory, version):
+        try:
+            bundle = Bundle(directory, version)
+        finally:
+            with self._lock:
+                self._loading = None
+        # a file caught mid-write, truncated or pruned under us: keep serving the last good bundle, retry next check
+        if bundle.failed <= self._bundle.failed:
+            self._bundle = bundle